@@ -0,0 +1,27 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .recorder import ActivityBuffer, _current, collect
+
+
+class ActivityMiddleware:
+    """Records the activity of a request with its user as actor, see activity.recorder."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        token = _current.set(ActivityBuffer(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)
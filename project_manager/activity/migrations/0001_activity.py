@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:13
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('project', '0004_project_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('task.created', 'Task created'), ('task.updated', 'Task updated'), ('task.deleted', 'Task deleted'), ('task.assigned', 'Users assigned'), ('task.unassigned', 'Users unassigned'), ('comment.created', 'Comment created'), ('comment.deleted', 'Comment deleted'), ('member.added', 'Member added'), ('member.updated', 'Member role changed'), ('member.removed', 'Member removed')], max_length=20)),
+                ('task_id', models.BigIntegerField(blank=True, null=True)),
+                ('comment_id', models.BigIntegerField(blank=True, null=True)),
+                ('changes', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='project.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'id'], name='activity_project_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.timezone import now
+
+
+class Activity(models.Model):
+    """
+    One entry of a project's append-only activity log. Tasks and comments
+    are referenced by id only, so entries outlive the rows they describe.
+    """
+    VERB_CHOICES = [
+        ('task.created', 'Task created'),
+        ('task.updated', 'Task updated'),
+        ('task.deleted', 'Task deleted'),
+        ('task.assigned', 'Users assigned'),
+        ('task.unassigned', 'Users unassigned'),
+        ('comment.created', 'Comment created'),
+        ('comment.deleted', 'Comment deleted'),
+        ('member.added', 'Member added'),
+        ('member.updated', 'Member role changed'),
+        ('member.removed', 'Member removed'),
+    ]
+
+    project = models.ForeignKey('project.Project', on_delete=models.CASCADE, related_name='activity')
+    actor = models.ForeignKey('auth_app.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    task_id = models.BigIntegerField(null=True, blank=True)
+    comment_id = models.BigIntegerField(null=True, blank=True)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # Set when the change is recorded, not when the buffer is written.
+    created_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'id'], name='activity_project_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.verb} in project {self.project_id}"
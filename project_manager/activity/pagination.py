@@ -0,0 +1,8 @@
+from django.conf import settings
+from project_manager.pagination import KeysetPagination
+
+
+class ActivityPagination(KeysetPagination):
+    ordering = ('-id',)
+    page_size = settings.ACTIVITY_PAGE_SIZE
+    max_page_size = 500
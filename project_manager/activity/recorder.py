@@ -0,0 +1,113 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .models import Activity
+
+logger = logging.getLogger(__name__)
+_current = ContextVar("activity_buffer", default=None)
+
+
+def actor_id(request):
+    # DRF copies the user it authenticated back onto the Django request.
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user.id
+
+
+class ActivityBatch:
+    """The entries recorded in one transaction, written when it commits."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.entries = []
+        self.written = False
+
+    def __call__(self):
+        self.written = True
+        actor = actor_id(self.request)
+        for entry in self.entries:
+            entry.actor_id = actor
+        try:
+            Activity.objects.bulk_create(self.entries)
+        except Exception:
+            # The change itself is already committed, losing its activity
+            # must not turn it into an error for the client.
+            logger.exception("Could not write %d activity entries", len(self.entries))
+
+
+class ActivityBuffer:
+    """
+    Collects the activity of one request. Entries are grouped by the
+    transaction that made the change, and each group is written with one
+    bulk_create from transaction.on_commit, so rolled back changes never
+    show up and committed ones are logged right after the commit.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self.batches = {}
+
+    def add(self, entry):
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            batch = ActivityBatch(self.request)
+            batch.entries.append(entry)
+            batch()
+            return
+        # Entries made inside a savepoint get their own batch, so rolling
+        # the savepoint back drops them together with its on_commit callback.
+        key = tuple(connection.savepoint_ids)
+        batch = self.batches.get(key)
+        if batch is None or batch.written or not any(func is batch for _, func, _ in connection.run_on_commit):
+            batch = self.batches[key] = ActivityBatch(self.request)
+            transaction.on_commit(batch)
+        batch.entries.append(entry)
+
+
+@contextmanager
+def collect(request=None):
+    token = _current.set(ActivityBuffer(request))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def record(project_id, verb, task_id=None, comment_id=None, changes=None):
+    entry = Activity(project_id=project_id, verb=verb, task_id=task_id, comment_id=comment_id, changes=changes or {})
+    # Outside of a request, e.g. in the shell or a management command,
+    # there is no actor.
+    buffer = _current.get() or ActivityBuffer()
+    buffer.add(entry)
+
+
+def task_created(task):
+    changes = task.get_state()
+    changes.pop("project", None)
+    record(task.project_id, "task.created", task_id=task.pk, changes=changes)
+
+
+def task_changed(task):
+    changes = task.get_changes()
+    if changes:
+        record(task.project_id, "task.updated", task_id=task.pk, changes=changes)
+
+
+def assignments_changed(task, added=(), removed=()):
+    if added:
+        record(task.project_id, "task.assigned", task_id=task.pk, changes={"users": sorted(added)})
+    if removed:
+        record(task.project_id, "task.unassigned", task_id=task.pk, changes={"users": sorted(removed)})
+
+
+def members_changed(project_id, previous, members):
+    """previous and members map user ids to their role before and after an upsert."""
+    for user_id, role in members.items():
+        if user_id not in previous:
+            record(project_id, "member.added", changes={"user": user_id, "role": role})
+        elif previous[user_id] != role:
+            record(project_id, "member.updated", changes={"user": user_id, "role": [previous[user_id], role]})
@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from .models import Activity
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    task = serializers.IntegerField(source="task_id", read_only=True)
+    comment = serializers.IntegerField(source="comment_id", read_only=True)
+
+    class Meta:
+        model = Activity
+        fields = ('id', 'verb', 'actor', 'task', 'comment', 'changes', 'created_at')
+
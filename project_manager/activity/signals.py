@@ -0,0 +1,73 @@
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from comments.models import Comment
+from project.models import ProjectUser
+from task.models import Task
+from .recorder import assignments_changed, record, task_changed, task_created
+
+
+def deleted_directly(origin, model):
+    # Rows removed by a cascade are covered by the entry of what was deleted.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is model
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        task_created(instance)
+    else:
+        task_changed(instance)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, Task):
+        record(instance.project_id, "task.deleted", task_id=instance.pk, changes={"title": instance.title})
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assignments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_clear":
+        # Collected in pre_clear by task.signals.
+        pk_set = getattr(instance, "_cleared_assignment_ids", [])
+    elif action not in ("post_add", "post_remove"):
+        return
+    if not pk_set:
+        return
+
+    changed = {"added": pk_set} if action == "post_add" else {"removed": pk_set}
+    if not reverse:
+        assignments_changed(instance, **changed)
+        return
+    changed = {key: [instance.pk] for key in changed}
+    for task in Task.objects.filter(pk__in=pk_set).only("id", "project_id"):
+        assignments_changed(task, **changed)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record(instance.get_project_id(), "comment.created", task_id=instance.task_id, comment_id=instance.pk, changes={"text": instance.text})
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, Comment):
+        record(instance.get_project_id(), "comment.deleted", task_id=instance.task_id, comment_id=instance.pk, changes={"text": instance.text})
+
+
+@receiver(post_save, sender=ProjectUser)
+def member_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record(instance.project_id, "member.added", changes={"user": instance.user_id, "role": instance.role})
+
+
+@receiver(post_delete, sender=ProjectUser)
+def member_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, ProjectUser):
+        record(instance.project_id, "member.removed", changes={"user": instance.user_id, "role": instance.role})
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.db import DatabaseError, transaction
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.urls import reverse
+from auth_app.models import User
+from comments.models import Comment
+from project.models import Project, ProjectUser
+from task.models import Task
+from .models import Activity
+from .recorder import ActivityBatch, collect
+
+
+class ActivityLogTests(APITestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', password='password', email='manager@example.com')
+        self.executor = User.objects.create_user(username='executor', password='password', email='executor@example.com')
+        self.project = Project.objects.create(name='Audited Project')
+        self.project.create_default_roles(self.manager)
+        ProjectUser.objects.create(user=self.executor, project=self.project, role='executor')
+        self.task = Task.objects.create(title='Write docs', description='API docs', project=self.project)
+        self.client.force_authenticate(user=self.manager)
+        self.url = reverse('project_activity', args=[self.project.id])
+
+    def entries(self, **filters):
+        return list(Activity.objects.filter(project=self.project, **filters).order_by('id').values('verb', 'actor', 'task_id', 'changes'))
+
+    def test_task_patch_logs_diff_and_assignments(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/task/{self.task.id}/', {
+                'status': 'in_progress',
+                'description': 'API docs',
+                'assigned_to': [self.executor.id],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.entries(actor=self.manager), [
+            {'verb': 'task.updated', 'actor': self.manager.id, 'task_id': self.task.id, 'changes': {'status': ['new', 'in_progress']}},
+            {'verb': 'task.assigned', 'actor': self.manager.id, 'task_id': self.task.id, 'changes': {'users': [self.executor.id]}},
+        ])
+
+    def test_transaction_entries_written_at_once_on_commit(self):
+        with collect(), self.captureOnCommitCallbacks() as callbacks:
+            task = Task.objects.create(title='Plan release', description='', project=self.project)
+            try:
+                with transaction.atomic():
+                    task.title = 'Rolled back'
+                    task.save()
+                    raise ValueError
+            except ValueError:
+                pass
+            Comment.objects.create(task=task, user=self.manager, text='Looks good')
+        batches = [callback for callback in callbacks if isinstance(callback, ActivityBatch)]
+        self.assertEqual([[entry.verb for entry in batch.entries] for batch in batches], [['task.created', 'comment.created']])
+        self.assertFalse(Activity.objects.filter(task_id=task.id).exists())
+        with self.assertNumQueries(1):
+            batches[0]()
+        self.assertEqual(Activity.objects.filter(task_id=task.id).count(), 2)
+
+    def test_write_failure_is_logged(self):
+        with mock.patch.object(Activity.objects, 'bulk_create', side_effect=DatabaseError('disk full')), \
+                self.assertLogs('activity.recorder', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(f'/api/task/{self.task.id}/', {'status': 'completed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'completed')
+
+    def test_batch_and_deletes_are_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('task_batch'), {
+                'create': [{'title': 'New', 'description': 'Batch', 'project': self.project.id, 'assigned_to': [self.executor.id]}],
+                'update': [{'id': self.task.id, 'title': 'Write guides', 'assigned_to': [self.manager.id]}],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        created = response.data['create'][0]['id']
+        self.assertEqual(
+            {(entry['verb'], entry['task_id']) for entry in self.entries(actor=self.manager)},
+            {('task.created', created), ('task.assigned', created), ('task.updated', self.task.id), ('task.assigned', self.task.id)},
+        )
+        self.assertEqual(self.entries(verb='task.updated')[0]['changes'], {'title': ['Write docs', 'Write guides']})
+
+        comment = Comment.objects.create(task=self.task, user=self.manager, text='First draft')
+        other = Comment.objects.create(task=self.task, user=self.manager, text='Second draft')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/task/{self.task.id}/comments/{comment.id}/')
+            self.client.delete(f'/api/task/{self.task.id}/')
+        deleted = Activity.objects.filter(verb__endswith='.deleted').values_list('verb', 'comment_id', 'changes')
+        self.assertEqual(sorted(deleted), [
+            ('comment.deleted', comment.id, {'text': 'First draft'}),
+            ('task.deleted', None, {'title': 'Write guides'}),
+        ])
+        self.assertFalse(Activity.objects.filter(comment_id=other.id, verb='comment.deleted').exists())
+
+    def test_staff_changes_are_logged(self):
+        newcomer = User.objects.create_user(username='newcomer', password='password', email='newcomer@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('project_staff', args=[self.project.id]), {
+                'staff': [{'user_id': newcomer.id, 'role': 'executor'}, {'user_id': self.executor.id, 'role': 'manager'}],
+            }, format='json')
+            self.client.post(reverse('project_staff', args=[self.project.id]), {'remove_staff': [newcomer.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(entry['verb'], entry['changes']) for entry in self.entries(actor=self.manager)], [
+            ('member.added', {'user': newcomer.id, 'role': 'executor'}),
+            ('member.updated', {'user': self.executor.id, 'role': ['executor', 'manager']}),
+            ('member.removed', {'user': newcomer.id, 'role': 'executor'}),
+        ])
+
+    def test_feed_pagination_filters_and_access(self):
+        Activity.objects.bulk_create([
+            Activity(project=self.project, verb='task.created', task_id=self.task.id, actor=self.manager) for _ in range(3)
+        ])
+
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = [entry['id'] for entry in response.data['results']]
+        self.assertEqual(first, sorted(first, reverse=True))
+        response = self.client.get(response.data['next'])
+        self.assertLess(response.data['results'][0]['id'], first[-1])
+
+        response = self.client.get(self.url, {'task': self.task.id, 'verb': 'task.created'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['actor'], self.manager.id)
+        self.assertEqual(self.client.get(self.url, {'verb': 'task.renamed'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.executor)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
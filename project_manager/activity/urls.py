@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ProjectActivityView
+
+urlpatterns = [
+    path('<int:project_id>/activity/', ProjectActivityView.as_view(), name='project_activity'),
+]
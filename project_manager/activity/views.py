@@ -0,0 +1,89 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from project.models import Project
+from .models import Activity
+from .pagination import ActivityPagination
+from .serializers import ActivitySerializer
+
+VERBS = {verb for verb, _ in Activity.VERB_CHOICES}
+
+
+class ProjectActivityView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Activity log of a project, newest first",
+        manual_parameters=[
+            openapi.Parameter(
+                name="project_id",
+                in_=openapi.IN_PATH,
+                description="Project ID",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="task",
+                in_=openapi.IN_QUERY,
+                description="Only entries about this task",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="verb",
+                in_=openapi.IN_QUERY,
+                description="Only these kinds of entries, comma separated (task.updated, member.added, ...)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="cursor",
+                in_=openapi.IN_QUERY,
+                description="Cursor from the next link of the previous page",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="page_size",
+                in_=openapi.IN_QUERY,
+                description="Number of entries per page",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="Authorization",
+                in_=openapi.IN_HEADER,
+                description="JWT token format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: ActivitySerializer(many=True),
+            400: openapi.Response(description="Invalid filter"),
+            403: openapi.Response(description="Access denied"),
+            404: openapi.Response(description="Project not found"),
+        }
+    )
+    def get(self, request, project_id):
+        project = get_object_or_404(Project.objects.with_access(request.user), id=project_id)
+
+        if not project.can_manage:
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        entries = Activity.objects.filter(project_id=project.id)
+        task_id = request.query_params.get("task")
+        if task_id:
+            if not task_id.isdigit():
+                raise ValidationError({"task": "Expected a task ID."})
+            entries = entries.filter(task_id=task_id)
+        verbs = [verb for verb in request.query_params.get("verb", "").split(",") if verb]
+        if verbs:
+            unknown = set(verbs) - VERBS
+            if unknown:
+                raise ValidationError({"verb": f"Unknown verbs: {', '.join(sorted(unknown))}"})
+            entries = entries.filter(verb__in=verbs)
+
+        paginator = ActivityPagination()
+        page = paginator.paginate_queryset(entries, request, view=self)
+        return paginator.get_paginated_response(ActivitySerializer(page, many=True).data)
@@ -0,0 +1,55 @@
+from functools import cached_property
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .claims import get_claims_version, restore_claims_version
+from .models import User
+
+CLAIMS = ("username", "is_superuser", "ver")
+
+
+class ClaimsUser(TokenUser):
+    """
+    User built from the token claims. Attributes that are not claims are
+    read from the full model, which is loaded on first use.
+    """
+    @cached_property
+    def instance(self):
+        return User.objects.get(pk=self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Resolves the user from the token claims while the user's claims version
+    is unchanged. Tokens without claims or with a stale version fall back
+    to loading the user from the database, as does every token unless
+    AUTH_CLAIMS_FAST_PATH is on.
+    """
+    def get_user(self, validated_token):
+        if not settings.AUTH_CLAIMS_FAST_PATH:
+            return super().get_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        has_claims = user_id is not None and all(claim in validated_token for claim in CLAIMS)
+        current = get_claims_version(user_id) if has_claims else None
+        if has_claims and current == validated_token["ver"]:
+            return ClaimsUser(validated_token)
+
+        user = super().get_user(validated_token)
+        if has_claims and current is None and self.claims_match(validated_token, user):
+            # The version was evicted from the cache, the database confirms
+            # the claims are still accurate.
+            restore_claims_version(user.id, validated_token["ver"])
+        return user
+
+    def claims_match(self, validated_token, user):
+        return validated_token["username"] == user.username and validated_token["is_superuser"] == user.is_superuser
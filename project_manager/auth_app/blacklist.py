@@ -0,0 +1,85 @@
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+WARM_KEY = "token_blacklist:warm"
+
+
+def _cache_key(jti):
+    return f"token_blacklist:{jti}"
+
+
+class JTIBlacklist:
+    """
+    Answers whether a refresh token's JTI is blacklisted without a query per
+    refresh. With TOKEN_BLACKLIST_SHARED_CACHE every blacklisted JTI is kept
+    in the shared cache until its token expires, so all workers see a logout
+    at once. The cache is filled from the database the first time it is
+    found empty, which also covers a flushed or restarted Redis. Without a
+    shared cache a JTI is looked up in the database. JTIs known to be
+    blacklisted are also kept in process.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.expiries = {}
+
+    def __contains__(self, jti):
+        if jti in self.expiries:
+            return True
+        if not settings.TOKEN_BLACKLIST_SHARED_CACHE:
+            expires_at = (
+                BlacklistedToken.objects.filter(token__jti=jti)
+                .values_list("token__expires_at", flat=True)
+                .first()
+            )
+            if expires_at is None:
+                return False
+            self.remember(jti, expires_at)
+            return True
+
+        found = cache.get_many([WARM_KEY, _cache_key(jti)])
+        if WARM_KEY not in found:
+            self.warm()
+            found[_cache_key(jti)] = cache.get(_cache_key(jti))
+        return found.get(_cache_key(jti)) is not None
+
+    def add(self, jti, expires_at):
+        self.remember(jti, expires_at)
+        if settings.TOKEN_BLACKLIST_SHARED_CACHE:
+            timeout = (expires_at - now()).total_seconds()
+            if timeout > 0:
+                cache.set(_cache_key(jti), True, timeout)
+
+    def remember(self, jti, expires_at):
+        with self.lock:
+            current = now()
+            self.expiries = {key: value for key, value in self.expiries.items() if value > current}
+            if expires_at > current:
+                self.expiries[jti] = expires_at
+
+    def warm(self, batch_size=1000):
+        current = now()
+        rows = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=current)
+            .values_list("token__jti", "token__expires_at")
+            .iterator(chunk_size=batch_size)
+        )
+        # Timeouts are rounded up to the minute so rows can share a set_many
+        # call; an entry outliving its token by a little is harmless.
+        batches = {}
+        for jti, expires_at in rows:
+            timeout = math.ceil((expires_at - current).total_seconds() / 60) * 60
+            batches.setdefault(timeout, {})[_cache_key(jti)] = True
+        for timeout, values in batches.items():
+            cache.set_many(values, timeout)
+        cache.set(WARM_KEY, True, None)
+
+
+jti_blacklist = JTIBlacklist()
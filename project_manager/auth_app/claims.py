@@ -0,0 +1,42 @@
+"""
+Claims versions let ClaimsJWTAuthentication trust the claims of an access
+token without loading the user. Every save or delete of a User bumps the
+version through auth_app.signals. QuerySet.update() and raw SQL on the
+user table send no signals, so they must be followed by
+bump_claims_version() for the affected users. A version dropped from the
+cache only costs one database lookup, which restores it when the claims
+still match.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(user_id):
+    return f"auth_claims_version:{user_id}"
+
+
+def get_claims_version(user_id):
+    return cache.get(_version_key(user_id))
+
+
+def issue_claims_version(user_id):
+    return cache.get_or_set(_version_key(user_id), time.time_ns, None)
+
+
+def restore_claims_version(user_id, version):
+    cache.add(_version_key(user_id), version, None)
+
+
+def bump_claims_version(*user_ids):
+    keys = [_version_key(user_id) for user_id in user_ids if user_id is not None]
+    if not keys:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({key: version for key in keys}, None)
+
+    bump()
+    transaction.on_commit(bump)
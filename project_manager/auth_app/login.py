@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.core.cache import cache
+
+from .tokens import ClaimsRefreshToken
+
+
+class HasherSaturated(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a fixed number of slots for running and queued jobs.
+    Submitting to a full pool fails right away instead of queueing.
+    """
+    def __init__(self, workers, queue_size):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="login-hasher")
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HasherSaturated()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+hasher_pool = BoundedExecutor(settings.LOGIN_HASHER_WORKERS, settings.LOGIN_HASHER_QUEUE)
+
+
+def take_attempt(key, rate, period=60):
+    """
+    Fixed window counter allowing ``rate`` attempts per ``period`` seconds.
+    cache.add and cache.incr are atomic, so concurrent attempts cannot both
+    take the last one. Returns 0 when the attempt is allowed, otherwise the
+    number of seconds until the window ends.
+    """
+    current = time.time()
+    window = int(current // period)
+    window_key = f"{key}:{window}"
+    cache.add(window_key, 0, period)
+    try:
+        count = cache.incr(window_key)
+    except ValueError:
+        # The counter expired between add and incr.
+        cache.add(window_key, 1, period)
+        count = 1
+    if count <= rate:
+        return 0
+    return (window + 1) * period - current
+
+
+def throttle_wait(request, username):
+    digest = hashlib.sha1(str(username).encode()).hexdigest()
+    limits = (
+        (f"login_attempts:ip:{request.META.get('REMOTE_ADDR')}", settings.LOGIN_IP_RATE),
+        (f"login_attempts:username:{digest}", settings.LOGIN_USERNAME_RATE),
+    )
+    for key, rate in limits:
+        wait = take_attempt(key, rate)
+        if wait:
+            return wait
+    return 0
+
+
+def verify_password(password, encoded):
+    """
+    Runs on the hasher pool. Returns whether the password matches and, when
+    the stored hash uses outdated parameters, the re-hashed password.
+
+    The login view checks passwords here instead of calling authenticate(),
+    so AUTHENTICATION_BACKENDS other than ModelBackend are not consulted.
+    The view sends user_login_failed itself.
+    """
+    if encoded is None:
+        # Hash anyway so unknown usernames take as long as wrong passwords.
+        make_password(password)
+        return False, None
+    if not check_password(password, encoded):
+        return False, None
+    preferred = get_hasher("default")
+    try:
+        outdated = identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded)
+    except ValueError:
+        outdated = False
+    return True, make_password(password) if outdated else None
+
+
+async def alogin_failed(request, username):
+    return await user_login_failed.asend(sender=__name__, credentials={"username": username}, request=request)
+
+
+def issue_tokens(user):
+    refresh = ClaimsRefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
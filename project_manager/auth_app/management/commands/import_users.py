@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auth_app.user_import import UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV or NDJSON file with username, email, first_name, last_name "
+        "and either password or password_hash columns"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Processes hashing raw passwords (defaults to the CPU count, 0 hashes in this process)",
+        )
+        parser.add_argument("--rejects", help="Write rejected rows to this file as NDJSON instead of stderr")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or ("csv" if options["path"].endswith(".csv") else "ndjson")
+        if options["path"] == "-":
+            stream = sys.stdin
+        elif os.path.exists(options["path"]):
+            stream = open(options["path"], newline="", encoding="utf-8")
+        else:
+            raise CommandError(f"File not found: {options['path']}")
+        rejects = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+
+        def on_reject(line, username, errors):
+            if rejects:
+                rejects.write(json.dumps({"line": line, "username": username, "errors": errors}) + "\n")
+            else:
+                self.stderr.write(f"line {line} ({username or '-'}): {json.dumps(errors)}")
+
+        try:
+            importer = UserImporter(chunk_size=options["chunk_size"], workers=options["workers"], on_reject=on_reject)
+            counts = importer.run(read_rows(stream, file_format))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects:
+                rejects.close()
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Users imported"))
@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import User
+from .tokens import ClaimsRefreshToken, add_user_claims
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -20,4 +24,24 @@ class UserSerializer(serializers.ModelSerializer):
 
     
     def create(self, validated_data):
-        return User.objects.create_user(**validated_data)   
\ No newline at end of file
+        return User.objects.create_user(**validated_data)   
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        # Re-issue the claims so a refreshed access token reflects the
+        # current user and claims version.
+        data = {"access": str(add_user_claims(refresh.access_token, user))}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh = self.token_class.for_user(user)
+            data["refresh"] = str(refresh)
+        return data
@@ -2,7 +2,28 @@ from django.test import TestCase
 from rest_framework.test import APITestCase
 from .models import User
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .authentication import ClaimsJWTAuthentication, ClaimsUser
+from .blacklist import JTIBlacklist, jti_blacklist
+from .tokens import ClaimsRefreshToken
+from .login import BoundedExecutor
+import json
+import os
+import tempfile
+from django.contrib.auth import authenticate
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth.hashers import make_password
+import threading
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 
 class AuthTests(APITestCase):
 
@@ -63,4 +84,233 @@ class AuthTests(APITestCase):
     def test_logout_with_invalid_token(self):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid_token')
         response = self.client.post(self.logout_url, {"refresh": "invalid_token"})
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+@override_settings(AUTH_CLAIMS_FAST_PATH=True)
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="claims", email="claims@example.com", password="TestPassword123")
+        response = self.client.post("/api/auth/login/", {"username": "claims", "password": "TestPassword123"})
+        self.access = response.data["access"]
+        self.refresh = response.data["refresh"]
+        self.url = "/api/projects/"
+
+    def count_queries(self, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_claims_token_skips_user_lookup(self):
+        plain_token = RefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.count_queries(self.access), self.count_queries(plain_token) - 1)
+
+    def test_claims_user_loads_model_on_demand(self):
+        user = ClaimsJWTAuthentication().get_user(AccessToken(self.access))
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.username, "claims")
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "claims@example.com")
+            self.assertEqual(user.date_joined, self.user.date_joined)
+
+    def test_changed_user_falls_back_to_database(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_reissues_current_claims(self):
+        self.user.is_superuser = True
+        self.user.save()
+        response = self.client.post("/api/auth/token/refresh/", {"refresh": self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = AccessToken(response.data["access"])
+        self.assertTrue(token["is_superuser"])
+        self.assertIsInstance(ClaimsJWTAuthentication().get_user(token), ClaimsUser)
+
+    @override_settings(AUTH_CLAIMS_FAST_PATH=False)
+    def test_claims_ignored_without_shared_cache(self):
+        self.assertEqual(self.count_queries(self.access), self.count_queries(RefreshToken.for_user(self.user).access_token))
+        user = ClaimsJWTAuthentication().get_user(AccessToken(self.access))
+        self.assertIsInstance(user, User)
+
+
+class TokenBlacklistTests(APITestCase):
+    def setUp(self):
+        jti_blacklist.reset()
+        self.user = User.objects.create_user(username="blacklist", email="blacklist@example.com", password="TestPassword123")
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def test_refresh_checks_blacklist(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/token/refresh/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum("blacklistedtoken" in query["sql"] for query in queries.captured_queries), 1)
+
+        response = self.client.post("/api/auth/logout/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/token/refresh/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(any("blacklistedtoken" in query["sql"] for query in queries.captured_queries))
+
+    def test_blacklist_seen_by_other_processes(self):
+        other_process = JTIBlacklist()
+        self.assertNotIn(self.refresh["jti"], other_process)
+        self.refresh.blacklist()
+        self.assertIn(self.refresh["jti"], other_process)
+
+    def test_purge_tokens_removes_expired_rows(self):
+        expired = ClaimsRefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(expires_at=now() - timedelta(days=1))
+        for _ in range(2):
+            OutstandingToken.objects.filter(jti=ClaimsRefreshToken.for_user(self.user)["jti"]).update(
+                expires_at=now() - timedelta(days=1)
+            )
+
+        call_command("purge_tokens", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), [self.refresh["jti"]])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(TOKEN_BLACKLIST_SHARED_CACHE=True)
+class SharedTokenBlacklistTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        jti_blacklist.reset()
+        self.user = User.objects.create_user(username="shared", email="shared@example.com", password="TestPassword123")
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def test_refresh_answered_from_cache(self):
+        self.assertNotIn(self.refresh["jti"], jti_blacklist)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/token/refresh/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("blacklistedtoken" in query["sql"] for query in queries.captured_queries))
+
+        response = self.client.post("/api/auth/logout/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+        other_process = JTIBlacklist()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn(self.refresh["jti"], other_process)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    def test_cache_filled_from_database(self):
+        self.refresh.blacklist()
+        expired = ClaimsRefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(expires_at=now() - timedelta(days=1))
+        cache.clear()
+
+        other_process = JTIBlacklist()
+        self.assertIn(self.refresh["jti"], other_process)
+        self.assertIsNone(cache.get(f"token_blacklist:{expired['jti']}"))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertNotIn(ClaimsRefreshToken.for_user(self.user)["jti"], other_process)
+        self.assertFalse(any("blacklistedtoken" in query["sql"] for query in queries.captured_queries))
+
+
+class LoginThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="burst", email="burst@example.com", password="TestPassword123")
+
+    def test_login(self):
+        response = self.client.post("/api/auth/login/", {"username": "burst", "password": "TestPassword123"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ver", AccessToken(response.data["access"]))
+
+        response = self.client.post("/api/auth/login/", {"username": "burst", "password": "wrong"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_rejects_non_string_credentials(self):
+        for payload in ([], {"username": "x", "password": 123}, {"username": ["burst"], "password": "TestPassword123"}):
+            with self.subTest(payload=payload):
+                response = self.client.post("/api/auth/login/", payload, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LOGIN_USERNAME_RATE=2)
+    @mock.patch("auth_app.login.time.time", return_value=1_000_050.0)
+    def test_login_throttled_per_username(self, clock):
+        failures = []
+        handler = lambda sender, credentials, **kwargs: failures.append(credentials["username"])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        for _ in range(2):
+            response = self.client.post("/api/auth/login/", {"username": "burst", "password": "wrong"})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(failures, ["burst", "burst"])
+
+        response = self.client.post("/api/auth/login/", {"username": "burst", "password": "TestPassword123"})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+
+        response = self.client.post("/api/auth/login/", {"username": self.user.email, "password": "wrong"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_rejected_while_hasher_pool_is_full(self):
+        pool = BoundedExecutor(workers=1, queue_size=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+        try:
+            with mock.patch("auth_app.views.hasher_pool", pool):
+                response = self.client.post("/api/auth/login/", {"username": "burst", "password": "TestPassword123"})
+                self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        finally:
+            release.set()
+
+
+class ImportUsersCommandTests(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username="existing", email="existing@example.com", password="TestPassword123")
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(content)
+        return path
+
+    def test_import_csv_reports_rejected_rows(self):
+        path = self.write("users.csv", "\n".join([
+            "username,email,password,first_name",
+            "alice,alice@example.com,AlicePassword1,Alice",
+            "existing,new@example.com,Password123,",
+            "bob,existing@EXAMPLE.com,Password123,",
+            "carol,not-an-email,Password123,",
+            "dave,dave@example.com,,",
+            "alice,alice2@example.com,Password123,",
+            "erin,erin@example.com,ErinPassword1,",
+        ]))
+        rejects = os.path.join(self.directory.name, "rejects.ndjson")
+        out = StringIO()
+        # One uniqueness check and one INSERT inside a savepoint for the chunk.
+        with self.assertNumQueries(4):
+            call_command("import_users", path, workers=0, chunk_size=10, rejects=rejects, stdout=out)
+
+        self.assertIn("imported: 2", out.getvalue())
+        self.assertIn("rejected: 5", out.getvalue())
+        with open(rejects, encoding="utf-8") as rejected:
+            lines = sorted(json.loads(line)["line"] for line in rejected)
+        self.assertEqual(lines, [3, 4, 5, 6, 7])
+        self.assertEqual(User.objects.get(username="alice").first_name, "Alice")
+        self.assertTrue(authenticate(username="erin", password="ErinPassword1"))
+
+    def test_import_ndjson_with_hashes_and_process_pool(self):
+        hashed = make_password("HashedPassword1")
+        path = self.write("users.ndjson", "\n".join([
+            json.dumps({"username": "hashed", "email": "hashed@example.com", "password_hash": hashed}),
+            json.dumps({"username": "raw", "email": "raw@example.com", "password": "RawPassword1"}),
+            json.dumps({"username": "bad", "email": "bad@example.com", "password_hash": "plaintext"}),
+            "not json",
+        ]))
+        call_command("import_users", path, workers=1, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(User.objects.get(username="hashed").password, hashed)
+        self.assertTrue(User.objects.get(username="raw").check_password("RawPassword1"))
+        self.assertFalse(User.objects.filter(username="bad").exists())
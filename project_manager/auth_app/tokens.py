@@ -0,0 +1,30 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import jti_blacklist
+from .claims import issue_claims_version
+
+
+def add_user_claims(token, user):
+    token["username"] = user.username
+    token["is_superuser"] = user.is_superuser
+    token["ver"] = issue_claims_version(user.id)
+    return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in jti_blacklist:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        jti_blacklist.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload["exp"]))
+        return result
@@ -1,10 +1,10 @@
 from django.urls import path
-from .views import RegisterView, login_view, LogoutView
+from .views import RegisterView, LoginAsyncView, LogoutView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
-    path('login/', login_view, name='login'),
+    path('login/', LoginAsyncView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
@@ -0,0 +1,153 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import User
+
+OPTIONAL_FIELDS = ("first_name", "last_name")
+
+
+def read_rows(stream, file_format):
+    """Yields (line number, row dict) without loading the whole input."""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else {"__invalid__": True}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class UserImporter:
+    def __init__(self, chunk_size=1000, workers=None, on_reject=None):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.on_reject = on_reject or (lambda line, username, errors: None)
+        self.seen_usernames = set()
+        self.seen_emails = set()
+        self.imported = 0
+        self.rejected = 0
+
+    def run(self, rows):
+        pool = ProcessPoolExecutor(self.workers, initializer=django.setup) if self.workers != 0 else None
+        try:
+            for chunk in chunked(rows, self.chunk_size):
+                self.import_chunk(chunk, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return {"imported": self.imported, "rejected": self.rejected}
+
+    def reject(self, line, username, errors):
+        self.rejected += 1
+        self.on_reject(line, username, errors)
+
+    def import_chunk(self, chunk, pool):
+        candidates = []
+        for line, row in chunk:
+            user, raw_password, errors = self.build_user(row)
+            if errors:
+                self.reject(line, row.get("username"), errors)
+                continue
+            if user.username in self.seen_usernames or user.email in self.seen_emails:
+                self.reject(line, user.username, {"user": ["Duplicate username or email in the input."]})
+                continue
+            self.seen_usernames.add(user.username)
+            self.seen_emails.add(user.email)
+            candidates.append((line, user, raw_password))
+
+        candidates = self.drop_existing(candidates)
+        raw = [(user, password) for _, user, password in candidates if password is not None]
+        if raw:
+            passwords = [password for _, password in raw]
+            hashes = pool.map(make_password, passwords, chunksize=64) if pool else map(make_password, passwords)
+            for (user, _), hashed in zip(raw, hashes):
+                user.password = hashed
+
+        while candidates:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user for _, user, _ in candidates])
+                break
+            except IntegrityError:
+                # Someone registered one of these users since the check.
+                remaining = self.drop_existing(candidates)
+                if len(remaining) == len(candidates):
+                    raise
+                candidates = remaining
+        self.imported += len(candidates)
+
+    def build_user(self, row):
+        if row.get("__invalid__"):
+            return None, None, {"row": ["Expected a JSON object."]}
+        errors = {}
+        values = {}
+        for name in ("username", "email") + OPTIONAL_FIELDS:
+            value = "" if row.get(name) is None else str(row[name]).strip()
+            if not value and name in ("username", "email"):
+                errors[name] = ["This field is required."]
+                continue
+            try:
+                values[name] = User._meta.get_field(name).clean(value, None)
+            except ValidationError as error:
+                errors[name] = error.messages
+        if "email" in values:
+            values["email"] = User.objects.normalize_email(values["email"])
+
+        raw_password = row.get("password") or None
+        password_hash = row.get("password_hash") or None
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                errors["password_hash"] = ["Unknown password hash format."]
+        elif raw_password is None:
+            errors["password"] = ["Either password or password_hash is required."]
+
+        if errors:
+            return None, None, errors
+        user = User(**values, password=password_hash or "")
+        return user, None if password_hash else str(raw_password), None
+
+    def drop_existing(self, candidates):
+        if not candidates:
+            return candidates
+        usernames = [user.username for _, user, _ in candidates]
+        emails = [user.email for _, user, _ in candidates]
+        existing = User.objects.filter(Q(username__in=usernames) | Q(email__in=emails)).values_list("username", "email")
+        taken_usernames, taken_emails = set(), set()
+        for username, email in existing:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+        kept = []
+        for line, user, password in candidates:
+            errors = {}
+            if user.username in taken_usernames:
+                errors["username"] = ["This username is already taken."]
+            if user.email in taken_emails:
+                errors["email"] = ["This email is already in use."]
+            if errors:
+                self.reject(line, user.username, errors)
+            else:
+                kept.append((line, user, password))
+        return kept
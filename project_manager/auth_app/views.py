@@ -1,11 +1,17 @@
+import asyncio
+import math
+
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import ClaimsRefreshToken
+from .login import HasherSaturated, alogin_failed, hasher_pool, issue_tokens, throttle_wait, verify_password
+from .models import User
+from project_manager.async_views import AsyncAPIView
+from asgiref.sync import sync_to_async
 from .serializers import UserSerializer
-from rest_framework.decorators import api_view, permission_classes
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -84,49 +90,51 @@ class LogoutView(APIView):
             if not refresh_token:
                 return Response({"detail": "Refresh token required"}, status=status.HTTP_400_BAD_REQUEST)
             
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
             return Response(status=status.HTTP_400_BAD_REQUEST)
         
 
-@swagger_auto_schema(
-    method='post',
-    operation_description="Authenticate a user with JwT tokens",
-    request_body=openapi.Schema(
-        type=openapi.TYPE_OBJECT,
-        required=['username', 'password'],
-        properties={
-            'username': openapi.Schema(type=openapi.TYPE_STRING, description="Username"),
-            'password': openapi.Schema(type=openapi.TYPE_STRING, description="Password"),
-        },
-    ),
-    responses={
-        200: openapi.Response(
-            description="Successful authentication",
-            schema=openapi.Schema(
-                type=openapi.TYPE_OBJECT,
-                properties={
-                    'refresh': openapi.Schema(type=openapi.TYPE_STRING, description="Refresh token"),
-                    'access': openapi.Schema(type=openapi.TYPE_STRING, description="Access token"),
-                }
-            ),
-        ),
-        401: openapi.Response(description="Wrong credentials"),
-    },
-)
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def login_view(request):
-    from django.contrib.auth import authenticate
-    username = request.data.get("username")
-    password = request.data.get("password")
-    user = authenticate(username=username, password=password)
-    if user is not None:
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        })
-    return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+class LoginAsyncView(AsyncAPIView):
+    permission_classes = [AllowAny]
+    http_method_names = ['post']
+
+    async def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+        username = request.data.get("username")
+        password = request.data.get("password")
+        if not isinstance(username, str) or not isinstance(password, str):
+            return Response({"error": "username and password must be strings"}, status=status.HTTP_400_BAD_REQUEST)
+        wait = await sync_to_async(throttle_wait)(request, username)
+        if wait:
+            return too_many_attempts(wait)
+
+        user = await User.objects.filter(username=username).afirst()
+        try:
+            future = hasher_pool.submit(verify_password, password, user.password if user else None)
+        except HasherSaturated:
+            return login_busy()
+        valid, new_hash = await asyncio.wrap_future(future)
+
+        if valid and user.is_active:
+            if new_hash:
+                user.password = new_hash
+                await user.asave(update_fields=["password"])
+            return Response(await sync_to_async(issue_tokens)(user))
+        await alogin_failed(request, username)
+        return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+def too_many_attempts(wait):
+    response = Response({"error": "Too many login attempts"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
+
+
+def login_busy():
+    response = Response({"error": "Login is busy, try again shortly"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response["Retry-After"] = "1"
+    return response
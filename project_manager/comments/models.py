@@ -1,4 +1,25 @@
 from django.db import models
+from django.db.models import Q
+from project.models import access_annotation
+from task.models import Task, task_visibility
+
+
+class CommentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(task_visibility(user, 'task', 'task__project'))
+
+    def manageable_by(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(Q(task_visibility(user, 'task', 'task__project')) | Q(user_id=user.id))
+
+    def with_access(self, user):
+        return self.annotate(
+            can_view=access_annotation(user, task_visibility(user, 'task', 'task__project')),
+            can_manage=access_annotation(user, Q(task_visibility(user, 'task', 'task__project')) | Q(user_id=user.id)),
+        )
 
 
 class Comment(models.Model):
@@ -8,12 +29,20 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_at_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user.username} on {self.task.title}"
     
+    def get_project_id(self):
+        if Comment.task.is_cached(self):
+            return self.task.project_id
+        return Task.objects.filter(pk=self.task_id).values_list("project_id", flat=True).first()
+
     def user_has_access(self, user):
-        return (
-            user.is_superuser
-            or self.task.project.projectuser_set.filter(user=user, role__in=["creator", "manager"]).exists()
-            or self.task.assigned_to.filter(id=user.id).exists()
-        )
\ No newline at end of file
+        return Task.objects.visible_to(user).filter(pk=self.task_id).exists()
\ No newline at end of file
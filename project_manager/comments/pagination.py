@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db.models import Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from project_manager.pagination import KeysetPagination
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+    page_size = settings.COMMENT_PAGE_SIZE
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        after = self.get_after(request)
+        if after and not queryset.filter(pk=after).exists():
+            raise ValidationError({'after': 'Unknown comment of this task.'})
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        after = self.get_after(request)
+        if after and not await queryset.filter(pk=after).aexists():
+            raise ValidationError({'after': 'Unknown comment of this task.'})
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_after(self, request):
+        after = request.query_params.get('after')
+        if after and not after.isdigit():
+            raise ValidationError({'after': 'Expected a comment ID.'})
+        return after
+
+    def get_page_queryset(self, queryset, request):
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since_value = parse_datetime(since)
+            except ValueError:
+                # Well formed but out of range, e.g. month 13.
+                since_value = None
+            if since_value is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 datetime.'})
+            if timezone.is_naive(since_value):
+                since_value = timezone.make_aware(since_value)
+            queryset = queryset.filter(created_at__gt=since_value)
+
+        after = self.get_after(request)
+        if after:
+            anchor = Subquery(
+                queryset.model.objects.filter(pk=after).values('created_at')[:1]
+            )
+            queryset = queryset.filter(Q(created_at__gt=anchor) | Q(created_at=anchor, id__gt=after))
+
+        return super().get_page_queryset(queryset, request)
@@ -1,7 +1,13 @@
 from rest_framework import serializers
+from project_manager.fieldsets import SparseFieldsMixin
+from project_manager.serializers import ValuesSerializer
 from .models import Comment
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    serializer_class = CommentSerializer
@@ -0,0 +1,22 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from project.models import Project
+from task.counters import update_comment_counts
+from task.models import Task
+from .models import Comment
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_comment_counts({instance.task_id: 1})
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    # Comments deleted together with their task or project need no count.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model not in (Task, Project):
+        update_comment_counts({instance.task_id: -1})
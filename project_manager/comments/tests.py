@@ -1,3 +1,4 @@
+import warnings
 from django.test import TestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -5,9 +6,11 @@ from .models import Comment
 from project.models import Project
 from task.models import Task
 from auth_app.models import User
+from django.utils import timezone
 from django.utils.timezone import now
 from django.urls import reverse
 from rest_framework_simplejwt.tokens import RefreshToken
+from project.testing import QueryBudgetMixin
 
 class CommentAPIViewTests(APITestCase): 
     def setUp(self):
@@ -26,13 +29,97 @@ class CommentAPIViewTests(APITestCase):
     def test_get_comments(self):
         response = self.client.get(self.comment_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_get_comments_incrementally(self):
+        newer = [Comment.objects.create(task=self.task, user=self.user, text=f'Comment {i}') for i in range(3)]
+        header = self.auth_header_user['Authorization']
+
+        response = self.client.get(f'{self.comment_list_url}?after={self.comment.id}', HTTP_AUTHORIZATION=header)
+        self.assertEqual([comment['id'] for comment in response.data['results']], [comment.id for comment in newer])
+
+        since = self.comment.created_at.isoformat()
+        response = self.client.get(self.comment_list_url, {'since': since}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.get(f'{self.comment_list_url}?page_size=2', HTTP_AUTHORIZATION=header)
+        self.assertEqual([comment['id'] for comment in response.data['results']], [self.comment.id, newer[0].id])
+        response = self.client.get(response.data['next'], HTTP_AUTHORIZATION=header)
+        self.assertEqual([comment['id'] for comment in response.data['results']], [newer[1].id, newer[2].id])
+        self.assertIsNone(response.data['next'])
+
+        for since in ('yesterday', '2024-13-01T00:00:00'):
+            response = self.client.get(self.comment_list_url, {'since': since}, HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        naive = timezone.localtime(self.comment.created_at).replace(tzinfo=None).isoformat()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = self.client.get(self.comment_list_url, {'since': naive}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(len(response.data['results']), 3)
+
+        gone = newer[0].id
+        newer[0].delete()
+        other_task = Task.objects.create(title='Other Task', project=self.task.project)
+        foreign = Comment.objects.create(task=other_task, user=self.user, text='Elsewhere')
+        for url in (self.comment_list_url, reverse('comments_async', kwargs={'task_id': self.task.id})):
+            for anchor in (gone, foreign.id):
+                response = self.client.get(url, {'after': anchor}, HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fieldsets(self):
+        header = self.auth_header_user['Authorization']
+        for url in (self.comment_list_url, reverse('comments_async', kwargs={'task_id': self.task.id})):
+            response = self.client.get(url, {'exclude': 'text'}, HTTP_AUTHORIZATION=header)
+            self.assertEqual(set(response.json()['results'][0]), {'id', 'task', 'user', 'created_at', 'updated_at'})
+
+        response = self.client.get(self.comment_detail_url, {'fields': 'text'}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.data, {'text': 'Test comment'})
 
     def test_get_comment_by_id(self):
         response = self.client.get(self.comment_detail_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['text'], 'Test comment')
 
+    def test_async_reads_match_sync(self):
+        header = self.auth_header_user['Authorization']
+        for sync_url, async_url in (
+            (self.comment_list_url, reverse('comments_async', kwargs={'task_id': self.task.id})),
+            (self.comment_detail_url, reverse('comment_detail_async', kwargs={'task_id': self.task.id, 'comment_id': self.comment.id})),
+        ):
+            expected = self.client.get(sync_url, {'page_size': 1}, HTTP_AUTHORIZATION=header)
+            response = self.client.get(async_url, {'page_size': 1}, HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data.get('results'), expected.data.get('results'))
+            self.assertEqual(response.data.get('text'), expected.data.get('text'))
+
+    def test_get_comment_from_other_task(self):
+        other_task = Task.objects.create(title='Other Task', project=self.project)
+        url = reverse('comment_detail', kwargs={'task_id': other_task.id, 'comment_id': self.comment.id})
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_author_can_delete_own_comment(self):
+        author = User.objects.create_user(username='author', password='password', email='author@example.com')
+        self.task.assigned_to.add(author)
+        comment = Comment.objects.create(task=self.task, user=author, text='Mine')
+        self.task.assigned_to.remove(author)
+
+        header = f'Bearer {str(RefreshToken.for_user(author).access_token)}'
+        url = reverse('comment_detail', kwargs={'task_id': self.task.id, 'comment_id': comment.id})
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=header).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.delete(url, HTTP_AUTHORIZATION=header).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_conditional_get_comments(self):
+        response = self.client.get(self.comment_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+        etag = response['ETag']
+        response = self.client.get(self.comment_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.comment.delete()
+        response = self.client.get(self.comment_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_create_comment(self):
         data = {"text": "New Comment"}
         response = self.client.post(self.comment_list_url, data, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
@@ -47,4 +134,30 @@ class CommentAPIViewTests(APITestCase):
     def test_access_denied_for_unauthorized_user(self):
         self.auth_header_user = {'Authorization': f'Bearer '}
         response = self.client.get(self.comment_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)    
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CommentQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='budget', password='password', email='budget@example.com')
+        self.project = Project.objects.create(name='Budget Project')
+        self.project.create_default_roles(self.user)
+        self.task = Task.objects.create(title='Budget Task', project=self.project)
+        self.comment = Comment.objects.create(task=self.task, user=self.user, text='First')
+        self.client.force_authenticate(user=self.user)
+
+    def add_comments(self, size):
+        Comment.objects.bulk_create([Comment(task=self.task, user=self.user, text=f'Comment {i}') for i in range(size)])
+
+    def test_comment_list_query_count(self):
+        url = reverse('comments', kwargs={'task_id': self.task.id})
+        self.assertQueryCountConstant(url, self.add_comments)
+
+    def test_comment_detail_query_count(self):
+        url = reverse('comment_detail', kwargs={'task_id': self.task.id, 'comment_id': self.comment.id})
+        self.assertQueryCountConstant(url, self.add_comments)
+
+    def test_task_comments_lookup_uses_index(self):
+        queryset = Comment.objects.filter(task_id=self.task.id).order_by('created_at', 'id')
+        self.assertUsesIndex(queryset, ['task_id', 'created_at'])
+
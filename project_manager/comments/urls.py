@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import CommentAPIView
+from .views import CommentAPIView, CommentAsyncView
 
 urlpatterns = [
     path('', CommentAPIView.as_view(), name='comments'),
     path('<int:comment_id>/', CommentAPIView.as_view(), name='comment_detail'),
+    path('async/', CommentAsyncView.as_view(), name='comments_async'),
+    path('async/<int:comment_id>/', CommentAsyncView.as_view(), name='comment_detail_async'),
 ]
\ No newline at end of file
@@ -4,8 +4,12 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from .models import Comment
-from .serializers import CommentSerializer
-from django.shortcuts import get_object_or_404
+from .serializers import CommentSerializer, CommentValuesSerializer
+from .pagination import CommentPagination
+from project_manager.async_views import AsyncAPIView
+from project_manager.fieldsets import DETAIL_COLUMNS, requested_fields, only_fields
+from project_manager.conditional import make_etag, list_etag, alist_etag, not_modified, with_validators
+from django.shortcuts import get_object_or_404, aget_object_or_404
 from task.models import Task
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -38,7 +42,43 @@ class CommentAPIView(APIView):
                 type=openapi.TYPE_INTEGER,
                 required=True
             ),
+            openapi.Parameter(
+                name="since",
+                in_=openapi.IN_QUERY,
+                description="Only comments created after this ISO 8601 datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="after",
+                in_=openapi.IN_QUERY,
+                description="Only comments that come after the comment with this ID",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="cursor",
+                in_=openapi.IN_QUERY,
+                description="Opaque cursor taken from the `next` link of the previous page",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="page_size",
+                in_=openapi.IN_QUERY,
+                description="Number of comments per page",
+                type=openapi.TYPE_INTEGER,
+            ),
 
+            openapi.Parameter(
+                name="fields",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. id,title,status",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="exclude",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated fields to leave out",
+                type=openapi.TYPE_STRING,
+            ),
         ],
         responses={
             200: CommentSerializer(many=True),
@@ -54,20 +94,35 @@ class CommentAPIView(APIView):
         }
     )
     def get(self, request, task_id,comment_id=None):
-        
-        task = get_object_or_404(Task, id=task_id)
+        selected = requested_fields(request, CommentSerializer)
+        if comment_id:
+            comments = only_fields(Comment.objects.with_access(request.user), selected, DETAIL_COLUMNS)
+            comment = get_object_or_404(comments, id=comment_id, task_id=task_id)
+            if not comment.can_view:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = make_etag("comment", comment.id, comment.updated_at.isoformat(), *(selected or ()))
+            cached = not_modified(request, etag, comment.updated_at)
+            if cached is not None:
+                return cached
+            serializer = CommentSerializer(comment, fields=selected)
+            return with_validators(Response(serializer.data), etag, comment.updated_at)
+
+        task = get_object_or_404(Task.objects.with_access(request.user), id=task_id)
 
-        if not task.user_has_access(request.user):
+        if not task.can_view:
             return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
         
-        if comment_id:
-            comment = get_object_or_404(Comment, id=comment_id)
-            serializer = CommentSerializer(comment)
-            return Response(serializer.data)
-        
         comments = Comment.objects.filter(task_id=task_id)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        etag = list_etag(request, comments)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        paginator = CommentPagination()
+        serializer = CommentValuesSerializer(fields=selected)
+        page = paginator.paginate_queryset(serializer.values(comments, CommentPagination.ordering), request, view=self)
+        return with_validators(paginator.get_paginated_response(serializer.to_representation(page)), etag)
 
     @swagger_auto_schema(
         operation_description="Create a new comment for a task",
@@ -111,10 +166,9 @@ class CommentAPIView(APIView):
         }
     )
     def post(self, request, task_id):
-        task = get_object_or_404(Task, id=task_id)
-        user = request.user
+        task = get_object_or_404(Task.objects.with_access(request.user), id=task_id)
         
-        if not Comment(task=task).user_has_access(user):
+        if not task.can_view:
             return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
         
         data = request.data.copy()
@@ -127,10 +181,40 @@ class CommentAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, task_id, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
-        user = request.user
+        comment = get_object_or_404(Comment.objects.with_access(request.user), id=comment_id, task_id=task_id)
 
-        if not comment.user_has_access(user) and comment.user != user:
+        if not comment.can_manage:
             return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
         comment.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CommentAsyncView(AsyncAPIView):
+    async def get(self, request, task_id, comment_id=None):
+        selected = requested_fields(request, CommentSerializer)
+        if comment_id:
+            comments = only_fields(Comment.objects.with_access(request.user), selected, DETAIL_COLUMNS)
+            comment = await aget_object_or_404(comments, id=comment_id, task_id=task_id)
+            if not comment.can_view:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = make_etag("comment", comment.id, comment.updated_at.isoformat(), *(selected or ()))
+            cached = not_modified(request, etag, comment.updated_at)
+            if cached is not None:
+                return cached
+            return with_validators(Response(CommentSerializer(comment, fields=selected).data), etag, comment.updated_at)
+
+        task = await aget_object_or_404(Task.objects.with_access(request.user).only("id"), id=task_id)
+        if not task.can_view:
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        comments = Comment.objects.filter(task_id=task_id)
+        etag = await alist_etag(request, comments)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        paginator = CommentPagination()
+        serializer = CommentValuesSerializer(fields=selected)
+        page = await paginator.apaginate_queryset(serializer.values(comments, CommentPagination.ordering), request, view=self)
+        return with_validators(paginator.get_paginated_response(await serializer.ato_representation(page)), etag)
@@ -0,0 +1,148 @@
+import csv
+import datetime
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Prefetch
+
+from auth_app.models import User
+from comments.models import Comment
+from task.models import Task
+from .models import Project, ProjectUser
+
+CSV_FIELDS = [
+    "record", "id", "name", "title", "description", "status", "role", "task", "user", "text",
+    "start_date", "end_date", "due_date", "created_at", "updated_at", "assigned_to",
+]
+
+
+def export_records(project, chunk_size=2000):
+    """
+    Yields the project, its members, tasks and comments one record at a
+    time. Every query is read with a server-side cursor so memory use does
+    not depend on the project size. All of them run in one transaction,
+    REPEATABLE READ on PostgreSQL, so comments never refer to tasks that
+    were not exported.
+    """
+    isolate = connection.vendor == "postgresql" and not connection.in_atomic_block
+    with transaction.atomic():
+        if isolate:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        yield from snapshot_records(Project.objects.get(pk=project.pk), chunk_size)
+
+
+def snapshot_records(project, chunk_size):
+    yield {
+        "record": "project",
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "start_date": project.start_date,
+        "end_date": project.end_date,
+        "updated_at": project.updated_at,
+    }
+
+    members = ProjectUser.objects.filter(project_id=project.id).order_by("id").values_list("user__username", "role")
+    for username, role in members.iterator(chunk_size=chunk_size):
+        yield {"record": "member", "user": username, "role": role}
+
+    tasks = (
+        Task.objects.filter(project_id=project.id)
+        .order_by("id")
+        .only("id", "title", "description", "status", "due_date", "created_at", "updated_at")
+        .prefetch_related(Prefetch("assigned_to", queryset=User.objects.only("id", "username")))
+    )
+    for task in tasks.iterator(chunk_size=chunk_size):
+        yield {
+            "record": "task",
+            "id": task.id,
+            "title": task.title,
+            "description": task.description,
+            "status": task.status,
+            "due_date": task.due_date,
+            "created_at": task.created_at,
+            "updated_at": task.updated_at,
+            "assigned_to": [user.username for user in task.assigned_to.all()],
+        }
+
+    comments = (
+        Comment.objects.filter(task__project_id=project.id)
+        .order_by("id")
+        .values("id", "task_id", "user__username", "text", "created_at", "updated_at")
+    )
+    for comment in comments.iterator(chunk_size=chunk_size):
+        yield {
+            "record": "comment",
+            "id": comment["id"],
+            "task": comment["task_id"],
+            "user": comment["user__username"],
+            "text": comment["text"],
+            "created_at": comment["created_at"],
+            "updated_at": comment["updated_at"],
+        }
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder cuts datetimes to milliseconds, keep them exact so
+        # an import restores the same timestamps.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=ExportEncoder, ensure_ascii=False) + "\n"
+
+
+class LineBuffer:
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(LineBuffer(), fieldnames=CSV_FIELDS)
+    yield writer.writeheader()
+    for record in records:
+        row = {}
+        for field, value in record.items():
+            if field == "assigned_to":
+                value = " ".join(value)
+            elif hasattr(value, "isoformat"):
+                value = value.isoformat()
+            row[field] = value
+        yield writer.writerow(row)
+
+
+async def astream_export(write_lines, records, lines_per_chunk=500):
+    """
+    Async iterator over the export for StreamingHttpResponse under ASGI,
+    which would otherwise read a sync iterator to the end before sending
+    anything. Lines are produced in batches through sync_to_async, which
+    keeps the export transaction on the request's sync thread.
+    """
+    lines = write_lines(records)
+
+    def next_chunk():
+        return "".join(islice(lines, lines_per_chunk))
+
+    def close():
+        lines.close()
+        records.close()
+
+    try:
+        while chunk := await sync_to_async(next_chunk)():
+            yield chunk
+    finally:
+        await sync_to_async(close)()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
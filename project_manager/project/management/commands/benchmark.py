@@ -0,0 +1,284 @@
+import asyncio
+import inspect
+import json
+import re
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.test import AsyncClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from auth_app.tokens import ClaimsRefreshToken
+import comments.urls
+import project.urls
+import task.urls
+from comments.models import Comment
+from comments.serializers import CommentSerializer, CommentValuesSerializer
+from project.models import ProjectUser
+from project_manager.renderers import FastJSONRenderer
+from task.models import Task
+from task.serializers import TaskSerializer, TaskValuesSerializer
+
+URLCONFS = [
+    ("/api/projects/", project.urls),
+    ("/api/task/", task.urls),
+    ("/api/task/<int:task_id>/comments/", comments.urls),
+]
+
+METHODS = ("get", "post", "patch", "delete")
+
+
+def payloads(sample):
+    return {
+        ("ProjectView", "post"): {"name": "Benchmark project", "description": "benchmark"},
+        ("ProjectView", "patch"): {"description": "benchmark"},
+        ("ProjectStaffView", "post"): {"staff": [{"user_id": sample["member_id"], "role": "executor"}]},
+        ("TaskView", "post"): {"title": "Benchmark task", "description": "benchmark", "project": sample["project_id"]},
+        ("TaskView", "patch"): {"status": "in_progress"},
+        ("TaskBatchView", "post"): {"update": [{"id": sample["task_id"], "status": "in_progress"}]},
+        ("CommentAPIView", "post"): {"text": "benchmark"},
+    }
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Run every project, task and comment endpoint and report latency, query count and peak memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--username", help="User to authenticate as (defaults to the creator of the largest project)")
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file as JSON")
+        parser.add_argument(
+            "--concurrency", type=int, default=1,
+            help="Also send this many simultaneous requests to every GET endpoint and report p99 and throughput",
+        )
+        parser.add_argument(
+            "--serialization", type=int, metavar="ROWS", default=0,
+            help="Also compare ModelSerializer + JSONRenderer with the values() serializer + FastJSONRenderer on this many rows",
+        )
+
+    def handle(self, *args, **options):
+        sample = self.get_sample(options["username"])
+        authorization = f"Bearer {ClaimsRefreshToken.for_user(sample['user']).access_token}"
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=authorization)
+
+        try:
+            setup_test_environment()
+            owns_environment = True
+        except RuntimeError:
+            # Already running under the test runner.
+            owns_environment = False
+        try:
+            results = []
+            for method, url, data, view_class in self.get_endpoints(sample):
+                result = self.measure(client, method, url, data, options["iterations"])
+                if method == "get" and options["concurrency"] > 1:
+                    result.update(self.measure_concurrent(
+                        authorization, url, view_class.view_is_async, options["concurrency"], options["iterations"]
+                    ))
+                results.append(result)
+        finally:
+            if owns_environment:
+                teardown_test_environment()
+
+        concurrent = options["concurrency"] > 1
+        header = f"{'endpoint':<48} {'status':>6} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KiB':>9}"
+        if concurrent:
+            header += f" {'load p99':>9} {'req/s':>9}"
+        self.stdout.write(header)
+        for result in results:
+            line = (
+                f"{result['endpoint']:<48} {result['status']:>6} {result['p50_ms']:>9.2f} "
+                f"{result['p99_ms']:>9.2f} {result['queries']:>8} {result['peak_kib']:>9.1f}"
+            )
+            if "load_p99_ms" in result:
+                line += f" {result['load_p99_ms']:>9.2f} {result['throughput']:>9.1f}"
+            self.stdout.write(line)
+        if options["serialization"]:
+            self.stdout.write("")
+            self.stdout.write(f"{'serialization':<48} {'rows':>6} {'model ms':>9} {'values ms':>9} {'speedup':>8}")
+            for result in self.measure_serialization(sample, options["serialization"], options["iterations"]):
+                self.stdout.write(
+                    f"{result['name']:<48} {result['rows']:>6} {result['model_ms']:>9.2f} "
+                    f"{result['values_ms']:>9.2f} {result['model_ms'] / result['values_ms']:>7.1f}x"
+                )
+        if options["json_path"]:
+            with open(options["json_path"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    def get_sample(self, username):
+        memberships = ProjectUser.objects.filter(role="creator").select_related("user")
+        if username:
+            memberships = memberships.filter(user__username=username)
+        membership = memberships.annotate(task_total=Count("project__tasks")).order_by("-task_total").first()
+        if membership is None:
+            raise CommandError("No project creator found, run seed_load first")
+
+        task_obj = Task.objects.filter(project_id=membership.project_id).order_by("id").first()
+        comment = Comment.objects.filter(task=task_obj).order_by("id").first() if task_obj else None
+        member = ProjectUser.objects.filter(project_id=membership.project_id).exclude(role="creator").first()
+        if task_obj is None or comment is None or member is None:
+            raise CommandError("The sample project needs tasks, comments and members, run seed_load first")
+        return {
+            "user": membership.user,
+            "project_id": membership.project_id,
+            "task_id": task_obj.id,
+            "comment_id": comment.id,
+            "member_id": member.user_id,
+        }
+
+    def get_endpoints(self, sample):
+        bodies = payloads(sample)
+        for prefix, urlconf in URLCONFS:
+            for pattern in urlconf.urlpatterns:
+                view_class = getattr(pattern.callback, "view_class", None)
+                if view_class is None:
+                    continue
+                route = prefix + str(pattern.pattern)
+                kwargs = set(re.findall(r"<\w+:(\w+)>", route))
+                url = re.sub(r"<\w+:(\w+)>", lambda match: str(sample[match.group(1)]), route)
+                for method in METHODS:
+                    handler = getattr(view_class, method, None)
+                    if handler is None:
+                        continue
+                    parameters = {
+                        name: parameter for name, parameter in inspect.signature(handler).parameters.items()
+                        if name not in ("self", "request")
+                    }
+                    required = {name for name, parameter in parameters.items() if parameter.default is inspect.Parameter.empty}
+                    if not required <= kwargs <= set(parameters):
+                        continue
+                    if method in ("post", "patch") and (view_class.__name__, method) not in bodies:
+                        self.stderr.write(f"Skipping {method.upper()} {route}: no sample payload")
+                        continue
+                    yield method, url, bodies.get((view_class.__name__, method)), view_class
+
+    def measure(self, client, method, url, data, iterations):
+        def call():
+            # Writes are rolled back so every iteration sees the same data.
+            with transaction.atomic():
+                if method == "get":
+                    response = client.get(url)
+                else:
+                    response = getattr(client, method)(url, data, format="json")
+                transaction.set_rollback(True)
+            return response
+
+        response = call()
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return {
+            "endpoint": f"{method.upper()} {url}",
+            "status": response.status_code,
+            "p50_ms": percentile(timings, 50),
+            "p99_ms": percentile(timings, 99),
+            "queries": len(queries),
+            "peak_kib": peak / 1024,
+        }
+
+    def measure_serialization(self, sample, rows, iterations):
+        tasks = Task.objects.filter(project_id=sample["project_id"]).order_by("id")
+        comments = Comment.objects.filter(task__project_id=sample["project_id"]).order_by("id")
+        cases = [
+            # The model path prefetches relations the way the views did before the values() serializers.
+            ("tasks", tasks, tasks.with_assignees(), TaskSerializer, TaskValuesSerializer),
+            ("comments", comments, comments, CommentSerializer, CommentValuesSerializer),
+        ]
+        for name, queryset, instances, serializer_class, values_class in cases:
+            def model_path():
+                return JSONRenderer().render(serializer_class(instances[:rows], many=True).data)
+
+            def values_path():
+                serializer = values_class()
+                return FastJSONRenderer().render(serializer.to_representation(serializer.values(queryset)[:rows]))
+
+            timings = {}
+            for label, path in (("model", model_path), ("values", values_path)):
+                path()
+                samples = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    path()
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[label] = percentile(samples, 50)
+            yield {
+                "name": f"{name} ({serializer_class.__name__})",
+                "rows": min(rows, queryset.count()),
+                "model_ms": timings["model"],
+                "values_ms": timings["values"],
+            }
+
+    def measure_concurrent(self, authorization, url, is_async, concurrency, rounds):
+        # Async views share one event loop, like a single ASGI worker; sync
+        # views get a thread per in-flight request, like a threaded worker.
+        if is_async:
+            client = AsyncClient()
+
+            async def timed_call():
+                async with ThreadSensitiveContext():
+                    started = time.perf_counter()
+                    response = await client.get(url, headers={"Authorization": authorization})
+                    return (time.perf_counter() - started) * 1000, response.status_code
+
+            async def burst():
+                return await asyncio.gather(*(timed_call() for _ in range(concurrency)))
+
+            run_burst = async_to_sync(burst)
+        else:
+            def timed_call(_):
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=authorization)
+                try:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    return (time.perf_counter() - started) * 1000, response.status_code
+                finally:
+                    connections.close_all()
+
+            pool = ThreadPoolExecutor(concurrency)
+
+            def run_burst():
+                return list(pool.map(timed_call, range(concurrency)))
+
+        calls = []
+        started = time.perf_counter()
+        for _ in range(rounds):
+            calls.extend(run_burst())
+        elapsed = time.perf_counter() - started
+        if not is_async:
+            pool.shutdown()
+
+        timings = [timing for timing, _ in calls]
+        failed = sum(1 for _, status in calls if status >= 400)
+        if failed:
+            self.stderr.write(f"GET {url}: {failed} of {len(calls)} concurrent requests failed")
+
+        return {
+            "concurrency": concurrency,
+            "load_p99_ms": percentile(timings, 99),
+            "throughput": len(timings) / elapsed,
+        }
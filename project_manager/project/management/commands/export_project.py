@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project.export import EXPORT_FORMATS, export_records
+from project.models import Project
+
+
+class Command(BaseCommand):
+    help = "Stream a project with its members, tasks and comments to NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("--output", choices=sorted(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument("--file", help="Write to this path instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=settings.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(id=options["project_id"]).first()
+        if project is None:
+            raise CommandError(f"Project {options['project_id']} does not exist")
+
+        write_lines, _ = EXPORT_FORMATS[options["output"]]
+        lines = write_lines(export_records(project, options["chunk_size"]))
+        if not options["file"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        with open(options["file"], "w", encoding="utf-8", newline="") as stream:
+            stream.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f"Project {project.id} exported to {options['file']}"))
@@ -0,0 +1,35 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from project.project_import import ProjectImporter, ProjectImportError, read_records
+
+
+class Command(BaseCommand):
+    help = "Load a project written by export_project (NDJSON) into a new project; users are matched by username"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["path"] == "-":
+            stream = sys.stdin
+        elif os.path.exists(options["path"]):
+            stream = open(options["path"], encoding="utf-8")
+        else:
+            raise CommandError(f"File not found: {options['path']}")
+
+        importer = ProjectImporter(chunk_size=options["chunk_size"])
+        try:
+            counts = importer.run(read_records(stream))
+        except ProjectImportError as error:
+            raise CommandError(f"Import failed, nothing was saved: {error}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Project imported with id {importer.project.id}"))
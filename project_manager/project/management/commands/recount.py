@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from project.models import Project
+from task.counters import recount_projects, recount_tasks
+from task.models import Task
+
+
+def id_batches(queryset, batch_size):
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+class Command(BaseCommand):
+    help = "Rebuild the task counters of projects and the comment counters of tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", dest="projects",
+                            help="Only this project and its tasks, can be repeated")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        tasks = Task.objects.all()
+        if options["projects"]:
+            projects = projects.filter(id__in=options["projects"])
+            tasks = tasks.filter(project_id__in=options["projects"])
+
+        # Every batch is its own transaction, so a long run holds no locks
+        # for long and can be interrupted.
+        fixed_projects = fixed_tasks = 0
+        for ids in id_batches(projects, options["batch_size"]):
+            with transaction.atomic():
+                fixed_projects += recount_projects(ids)
+        for ids in id_batches(tasks, options["batch_size"]):
+            with transaction.atomic():
+                fixed_tasks += recount_tasks(ids)
+
+        self.stdout.write(f"projects fixed: {fixed_projects}")
+        self.stdout.write(f"tasks fixed: {fixed_tasks}")
+        self.stdout.write(self.style.SUCCESS("Counters rebuilt"))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from project.seed import seed
+
+
+class Command(BaseCommand):
+    help = "Generate users, projects, memberships, tasks and comments for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--projects", type=int, default=10)
+        parser.add_argument("--members", type=int, default=10, help="Members per project")
+        parser.add_argument("--tasks", type=int, default=100, help="Tasks per project")
+        parser.add_argument("--comments", type=int, default=3, help="Comments per task")
+        parser.add_argument("--assignees", type=int, default=2, help="Assignees per task")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--password", default="password", help="Password of every seeded user")
+        parser.add_argument("--random-seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        for name in ("users", "projects", "members", "tasks", "comments", "assignees"):
+            if options[name] < 0:
+                raise CommandError(f"--{name} cannot be negative")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options["comments"] and not min(options["users"], options["members"]):
+            raise CommandError("--comments needs at least one user and member per project to write them")
+
+        counts = seed(
+            users=options["users"],
+            projects=options["projects"],
+            members=options["members"],
+            tasks=options["tasks"],
+            comments=options["comments"],
+            assignees=options["assignees"],
+            batch_size=options["batch_size"],
+            password=options["password"],
+            random_seed=options["random_seed"],
+        )
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Seed data created"))
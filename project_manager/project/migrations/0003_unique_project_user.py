@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+ROLE_PRIORITY = {'executor': 1, 'manager': 2, 'creator': 3}
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    ProjectUser = apps.get_model('project', 'ProjectUser')
+    duplicates = []
+    kept = None
+    memberships = ProjectUser.objects.order_by('user_id', 'project_id', 'id').values_list('id', 'user_id', 'project_id', 'role')
+    for membership in memberships.iterator(chunk_size=2000):
+        if kept is None or kept[1:3] != membership[1:3]:
+            kept = membership
+        elif ROLE_PRIORITY[membership[3]] > ROLE_PRIORITY[kept[3]]:
+            duplicates.append(kept[0])
+            kept = membership
+        else:
+            duplicates.append(membership[0])
+    ProjectUser.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0002_alter_projectuser_role_delete_projectrole'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_memberships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='projectuser',
+            constraint=models.UniqueConstraint(fields=('user', 'project'), name='unique_project_user'),
+        ),
+    ]
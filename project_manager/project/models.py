@@ -1,27 +1,120 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Q, Value, BooleanField, ExpressionWrapper, Count, Subquery
+from django.db.models.functions import Coalesce
 from auth_app.models import User
 from django.utils.timezone import now
 
+
+def membership_exists(user, project_ref='pk', roles=None):
+    members = ProjectUser.objects.filter(project=OuterRef(project_ref), user_id=user.id)
+    if roles:
+        members = members.filter(role__in=roles)
+    return Exists(members)
+
+
+def access_annotation(user, condition):
+    if user.is_superuser:
+        return Value(True, output_field=BooleanField())
+    return ExpressionWrapper(Q(condition), output_field=BooleanField())
+
+
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(membership_exists(user))
+
+    def manageable_by(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(membership_exists(user, roles=["creator", "manager"]))
+
+    def owned_by(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(membership_exists(user, roles=["creator"]))
+
+    def with_dashboard_counts(self):
+        # Task counts are stored on the project, only the overdue count
+        # depends on the clock and is counted here.
+        from task.models import Task
+        members = (
+            ProjectUser.objects.filter(project=OuterRef('pk'))
+            .order_by().values('project').annotate(total=Count('id')).values('total')
+        )
+        overdue = (
+            Task.objects.filter(project=OuterRef('pk'), due_date__lt=now()).exclude(status__in=Task.CLOSED_STATUSES)
+            .order_by().values('project').annotate(total=Count('id')).values('total')
+        )
+        return self.annotate(
+            overdue_count=Coalesce(Subquery(overdue), 0),
+            member_count=Coalesce(Subquery(members), 0),
+        )
+
+    def with_staff(self):
+        return self.prefetch_related(
+            models.Prefetch('staff', queryset=User.objects.only('id'))
+        )
+
+    def with_access(self, user):
+        return self.annotate(
+            can_view=access_annotation(user, membership_exists(user)),
+            can_manage=access_annotation(user, membership_exists(user, roles=["creator", "manager"])),
+            is_owner=access_annotation(user, membership_exists(user, roles=["creator"])),
+        )
+
+
 class Project(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     start_date = models.DateTimeField(default=now)
     end_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     staff = models.ManyToManyField(User, through="ProjectUser", related_name="projects", blank=True)
+    # Kept current by task.counters, rebuilt by the recount command.
+    task_count = models.IntegerField(default=0, editable=False)
+    new_count = models.IntegerField(default=0, editable=False)
+    in_progress_count = models.IntegerField(default=0, editable=False)
+    on_checking_count = models.IntegerField(default=0, editable=False)
+    completed_count = models.IntegerField(default=0, editable=False)
+    canceled_count = models.IntegerField(default=0, editable=False)
+
+    objects = ProjectQuerySet.as_manager()
     
     def __str__(self):
         return self.name
     
     def create_default_roles(self, creator):
-        ProjectUser.objects.create(user=creator, project=self, role="creator")
+        ProjectUser.objects.create(user_id=creator.id, project=self, role="creator")
 
     def has_creator_access(self, user):
-        return self.projectuser_set.filter(user=user, role="creator").exists()   
+        from .roles import get_project_role
+        return get_project_role(user, self.id) == "creator"
 
     def has_manager_access(self, user):
-        return self.projectuser_set.filter(user=user, role="manager").exists()
+        from .roles import get_project_role
+        return get_project_role(user, self.id) == "manager"
  
 
+class ProjectUserManager(models.Manager):
+    def upsert_members(self, project, members):
+        from .roles import invalidate_user_access
+        self.bulk_create(
+            [self.model(user_id=user_id, project=project, role=role) for user_id, role in members.items()],
+            update_conflicts=True,
+            unique_fields=["user", "project"],
+            update_fields=["role"],
+        )
+        Project.objects.filter(pk=project.pk).update(updated_at=now())
+        invalidate_user_access(*members)
+
+    def remove_members(self, project, user_ids):
+        from .roles import invalidate_user_access
+        self.filter(project=project, user_id__in=user_ids).exclude(role="creator").delete()
+        Project.objects.filter(pk=project.pk).update(updated_at=now())
+        invalidate_user_access(*user_ids)
+
+
 class ProjectUser(models.Model):
     ROLE_CHOICES = [
         ('creator', 'Creator'),
@@ -31,4 +124,11 @@ class ProjectUser(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
-    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
\ No newline at end of file
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+
+    objects = ProjectUserManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "project"], name="unique_project_user"),
+        ]
\ No newline at end of file
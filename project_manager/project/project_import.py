@@ -0,0 +1,212 @@
+import json
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.timezone import now
+
+from auth_app.models import User
+from comments.models import Comment
+from task.counters import update_comment_counts, update_task_counts
+from task.models import Task
+from .models import Project, ProjectUser
+from .roles import invalidate_user_access
+
+PROJECT_FIELDS = ("name", "description", "start_date", "end_date", "updated_at")
+TASK_FIELDS = ("title", "description", "status", "due_date", "created_at", "updated_at")
+COMMENT_FIELDS = ("text", "created_at", "updated_at")
+ROLES = {role for role, _ in ProjectUser.ROLE_CHOICES}
+
+
+class ProjectImportError(Exception):
+    pass
+
+
+def read_records(stream):
+    """Yields (line number, record) from the NDJSON written by project.export."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict) or "record" not in record:
+            raise ProjectImportError(f"line {line_number}: not a project export record")
+        yield line_number, record
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """
+    Lets exported created_at/updated_at values through instead of having
+    auto_now/auto_now_add replace them. This patches the model fields for
+    the whole process, so only use it from management commands.
+    """
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def clean_values(model, record, names, line_number):
+    values = {}
+    for name in names:
+        if record.get(name) is None:
+            if name in ("created_at", "updated_at"):
+                values[name] = now()
+            continue
+        field = model._meta.get_field(name)
+        try:
+            value = field.to_python(record[name])
+            # Like field.clean() without the blank check, so an exported
+            # empty description still loads, but choices and max_length hold.
+            if value not in field.empty_values:
+                field.validate(value, None)
+                field.run_validators(value)
+            values[name] = value
+        except ValidationError as error:
+            raise ProjectImportError(f"line {line_number}: {name}: {'; '.join(error.messages)}")
+    return values
+
+
+def require_username(username, line_number):
+    if not isinstance(username, str) or not username:
+        raise ProjectImportError(f"line {line_number}: expected a username, got {username!r}")
+    return username
+
+
+class ProjectImporter:
+    """
+    Loads one project export into a new project. Old task ids are mapped to
+    the new ones as tasks are inserted and users are matched by username, so
+    the file can come from another instance. Rows are inserted with
+    bulk_create in chunks and the whole import runs in one transaction.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.project = None
+        self.user_ids = {}
+        self.task_ids = {}
+        self.member_names = set()
+        self.members = []
+        self.tasks = []
+        self.comments = []
+        self.counts = {"projects": 0, "memberships": 0, "tasks": 0, "assignments": 0, "comments": 0}
+
+    def run(self, records):
+        with transaction.atomic(), keep_timestamps(Project, Task, Comment):
+            for line_number, record in records:
+                self.add(line_number, record)
+            if self.project is None:
+                raise ProjectImportError("the file has no project record")
+            self.flush_members()
+            self.flush_comments()
+        return self.counts
+
+    def add(self, line_number, record):
+        kind = record["record"]
+        if kind == "project":
+            if self.project is not None:
+                raise ProjectImportError(f"line {line_number}: a file can hold only one project")
+            self.project = Project.objects.create(**clean_values(Project, record, PROJECT_FIELDS, line_number))
+            self.counts["projects"] += 1
+            return
+        if self.project is None:
+            raise ProjectImportError(f"line {line_number}: the project record must come first")
+
+        if kind == "member":
+            username = require_username(record.get("user"), line_number)
+            if record.get("role", "executor") not in ROLES:
+                raise ProjectImportError(f"line {line_number}: unknown role {record.get('role')!r}")
+            if username in self.member_names:
+                raise ProjectImportError(f"line {line_number}: {username} is already a member")
+            self.member_names.add(username)
+            self.members.append((line_number, record))
+            if len(self.members) >= self.chunk_size:
+                self.flush_members()
+        elif kind == "task":
+            assigned_to = record.get("assigned_to", [])
+            if not isinstance(assigned_to, list):
+                raise ProjectImportError(f"line {line_number}: assigned_to must be a list of usernames")
+            for username in assigned_to:
+                require_username(username, line_number)
+            record["assigned_to"] = list(dict.fromkeys(assigned_to))
+            self.tasks.append((line_number, record))
+            if len(self.tasks) >= self.chunk_size:
+                self.flush_tasks()
+        elif kind == "comment":
+            require_username(record.get("user"), line_number)
+            self.comments.append((line_number, record))
+            if len(self.comments) >= self.chunk_size:
+                self.flush_comments()
+        else:
+            raise ProjectImportError(f"line {line_number}: unknown record type {kind!r}")
+
+    def resolve_users(self, usernames):
+        missing = set(usernames) - self.user_ids.keys()
+        if missing:
+            self.user_ids.update(User.objects.filter(username__in=missing).values_list("username", "id"))
+            unknown = missing - self.user_ids.keys()
+            if unknown:
+                raise ProjectImportError(f"unknown users: {', '.join(sorted(unknown))}")
+
+    def flush_members(self):
+        self.resolve_users(record.get("user") for _, record in self.members)
+        memberships = ProjectUser.objects.bulk_create([
+            ProjectUser(project=self.project, user_id=self.user_ids[record["user"]], role=record.get("role", "executor"))
+            for _, record in self.members
+        ])
+        # bulk_create sends no signals, drop the cached roles like upsert_members does.
+        invalidate_user_access(*(membership.user_id for membership in memberships))
+        self.counts["memberships"] += len(memberships)
+        self.members = []
+
+    def flush_tasks(self):
+        self.resolve_users(username for _, record in self.tasks for username in record.get("assigned_to", []))
+        tasks = Task.objects.bulk_create([
+            Task(project=self.project, **clean_values(Task, record, TASK_FIELDS, line_number))
+            for line_number, record in self.tasks
+        ])
+
+        through = Task.assigned_to.through
+        assignments = []
+        for task, (_, record) in zip(tasks, self.tasks):
+            self.task_ids[record.get("id")] = task.id
+            assignments.extend(
+                through(task_id=task.id, user_id=self.user_ids[username]) for username in record.get("assigned_to", [])
+            )
+        through.objects.bulk_create(assignments)
+        invalidate_user_access(*{assignment.user_id for assignment in assignments})
+        # Counters are kept without touching the exported updated_at values.
+        update_task_counts(Counter((self.project.id, task.status) for task in tasks), touch=False)
+        self.counts["tasks"] += len(tasks)
+        self.counts["assignments"] += len(assignments)
+        self.tasks = []
+
+    def flush_comments(self):
+        self.flush_tasks()
+        self.resolve_users(record.get("user") for _, record in self.comments)
+        comments = []
+        for line_number, record in self.comments:
+            if record.get("task") not in self.task_ids:
+                raise ProjectImportError(f"line {line_number}: comment refers to unknown task {record.get('task')}")
+            comments.append(Comment(
+                task_id=self.task_ids[record["task"]],
+                user_id=self.user_ids[record["user"]],
+                **clean_values(Comment, record, COMMENT_FIELDS, line_number),
+            ))
+        self.counts["comments"] += len(Comment.objects.bulk_create(comments))
+        update_comment_counts(Counter(comment.task_id for comment in comments), touch=False)
+        self.comments = []
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ProjectUser
+
+ROLE_PRIORITY = {"executor": 1, "manager": 2, "creator": 3}
+
+
+def _cache_key(user_id):
+    return f"project_roles:{user_id}"
+
+
+def load_user_access(user_id):
+    from task.models import Task
+
+    roles = {}
+    for project_id, role in ProjectUser.objects.filter(user_id=user_id).values_list("project_id", "role"):
+        if ROLE_PRIORITY[role] > ROLE_PRIORITY.get(roles.get(project_id), 0):
+            roles[project_id] = role
+    tasks = set(
+        Task.assigned_to.through.objects.filter(user_id=user_id).values_list("task_id", flat=True)
+    )
+    return {"roles": roles, "tasks": tasks}
+
+
+def get_user_access(user_id):
+    key = _cache_key(user_id)
+    access = cache.get(key)
+    if access is None:
+        access = load_user_access(user_id)
+        cache.set(key, access, settings.PROJECT_ROLE_CACHE_TIMEOUT)
+    return access
+
+
+def get_project_role(user, project_id):
+    return get_user_access(user.id)["roles"].get(project_id)
+
+
+def has_project_role(user, project_id, roles):
+    return get_project_role(user, project_id) in roles
+
+
+def is_task_assignee(user, task_id):
+    return task_id in get_user_access(user.id)["tasks"]
+
+
+def invalidate_user_access(*user_ids):
+    keys = [_cache_key(user_id) for user_id in user_ids if user_id is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # A request running concurrently with the write may re-populate the entry
+    # from the old data, so drop it once more when the write is visible.
+    transaction.on_commit(lambda: cache.delete_many(keys))
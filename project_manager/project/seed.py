@@ -0,0 +1,99 @@
+import random
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.timezone import now
+
+from auth_app.models import User
+from comments.models import Comment
+from task.counters import update_task_counts
+from task.models import Task
+from .models import Project, ProjectUser
+
+STATUSES = ["new", "in_progress", "on_checking", "completed", "canceled"]
+
+
+@transaction.atomic
+def seed(users=100, projects=10, members=10, tasks=100, comments=3, assignees=2,
+         batch_size=1000, password="password", random_seed=None):
+    rng = random.Random(random_seed)
+    run = uuid.uuid4().hex[:8]
+    hashed = make_password(password)
+    members = min(members, users)
+
+    user_ids = [
+        user.id for user in User.objects.bulk_create(
+            [
+                User(username=f"seed_{run}_{i}", email=f"seed_{run}_{i}@example.com", password=hashed)
+                for i in range(users)
+            ],
+            batch_size=batch_size,
+        )
+    ]
+    project_objs = Project.objects.bulk_create(
+        [Project(name=f"Seed project {run} #{i}", description="Seeded project") for i in range(projects)],
+        batch_size=batch_size,
+    )
+
+    memberships = []
+    project_members = {}
+    for project in project_objs:
+        staff = rng.sample(user_ids, members)
+        project_members[project.id] = staff
+        for position, user_id in enumerate(staff):
+            role = "creator" if position == 0 else rng.choice(["manager", "executor", "executor"])
+            memberships.append(ProjectUser(user_id=user_id, project=project, role=role))
+    ProjectUser.objects.bulk_create(memberships, batch_size=batch_size)
+
+    counts = {"users": len(user_ids), "projects": len(project_objs), "memberships": len(memberships),
+              "tasks": 0, "assignments": 0, "comments": 0}
+    for project in project_objs:
+        added = populate_project(project, project_members[project.id], tasks=tasks, comments=comments,
+                                 assignees=assignees, batch_size=batch_size, rng=rng)
+        for name, count in added.items():
+            counts[name] += count
+    return counts
+
+
+def populate_project(project, member_ids, tasks=100, comments=3, assignees=2, batch_size=1000, rng=None):
+    rng = rng or random.Random()
+    if not member_ids:
+        # Comments need an author from the project.
+        comments = 0
+    counts = {"tasks": 0, "assignments": 0, "comments": 0}
+    through = Task.assigned_to.through
+    current = now()
+    for start in range(0, tasks, batch_size):
+        task_objs = Task.objects.bulk_create([
+            Task(
+                title=f"Task {i}",
+                description=f"Seeded task {i} of {project.name}",
+                status=rng.choice(STATUSES),
+                due_date=current + timedelta(days=rng.randint(-30, 30)),
+                project=project,
+                comment_count=comments,
+            )
+            for i in range(start, min(start + batch_size, tasks))
+        ])
+        assignments = [
+            through(task_id=task.id, user_id=user_id)
+            for task in task_objs
+            for user_id in rng.sample(member_ids, min(assignees, len(member_ids)))
+        ]
+        through.objects.bulk_create(assignments, batch_size=batch_size)
+        update_task_counts(Counter((project.id, task.status) for task in task_objs))
+        comment_objs = Comment.objects.bulk_create(
+            [
+                Comment(task=task, user_id=rng.choice(member_ids), text=f"Seeded comment {n}")
+                for task in task_objs
+                for n in range(comments)
+            ],
+            batch_size=batch_size,
+        )
+        counts["tasks"] += len(task_objs)
+        counts["assignments"] += len(assignments)
+        counts["comments"] += len(comment_objs)
+    return counts
@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from project_manager.fieldsets import SparseFieldsMixin
 from .models import Project
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = '__all__'
\ No newline at end of file
@@ -0,0 +1,22 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from .models import Project, ProjectUser
+from .roles import invalidate_user_access
+
+
+@receiver([post_save, post_delete], sender=ProjectUser)
+def invalidate_member_access(sender, instance, **kwargs):
+    invalidate_user_access(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=ProjectUser)
+def touch_project(sender, instance, raw=False, origin=None, **kwargs):
+    # The staff list is part of the project representation and its ETag.
+    # Queryset deletes come from remove_members, which bumps the project
+    # once, and a deleted project has nothing left to bump.
+    if raw or isinstance(origin, (QuerySet, Project)):
+        return
+    Project.objects.filter(pk=instance.project_id).update(updated_at=now())
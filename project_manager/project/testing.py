@@ -0,0 +1,66 @@
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    dataset_sizes = (2, 25)
+
+    def count_queries(self, url, method="get"):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400, f"{method.upper()} {url} returned {response.status_code}")
+        return len(context)
+
+    def assertQueryCountConstant(self, url, grow, method="get"):
+        counts = []
+        for size in self.dataset_sizes:
+            grow(size)
+            counts.append(self.count_queries(url, method))
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"{method.upper()} {url} query count grows with data: {dict(zip(self.dataset_sizes, counts))}",
+        )
+        return counts[0]
+
+    def assertUsesIndex(self, queryset, columns):
+        table = queryset.model._meta.db_table
+        names = [name for name, index_columns in self.get_indexes(table) if index_columns[:len(columns)] == list(columns)]
+        self.assertTrue(names, f"No index on {table}({', '.join(columns)})")
+
+        if connection.vendor == "postgresql":
+            # Tiny test tables make a sequential scan cheapest and every index
+            # on the leading column equally cheap, so rule out the scan and
+            # hide the other indexes to see whether the planner can use these.
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                    constraints = connection.introspection.get_constraints(cursor, table)
+                    for name, info in constraints.items():
+                        if info["index"] and not info["unique"] and not info["primary_key"] and name not in names:
+                            cursor.execute(f'DROP INDEX "{name}"')
+                plan = queryset.explain()
+                transaction.set_rollback(True)
+        else:
+            plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in names),
+            f"Query on {table} does not use any of {names}:\n{plan}",
+        )
+
+    def get_indexes(self, table):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                # Unique constraints are backed by sqlite_autoindex_* indexes
+                # that introspection reports under the constraint name.
+                cursor.execute(f'PRAGMA index_list("{table}")')
+                names = [row[1] for row in cursor.fetchall()]
+                indexes = []
+                for name in names:
+                    cursor.execute(f'PRAGMA index_info("{name}")')
+                    indexes.append((name, [row[2] for row in sorted(cursor.fetchall())]))
+                return indexes
+            constraints = connection.introspection.get_constraints(cursor, table)
+        return [
+            (name, info["columns"]) for name, info in constraints.items()
+            if info["index"] or info["unique"]
+        ]
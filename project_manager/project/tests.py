@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from rest_framework.test import APITestCase
 from auth_app.models import User
 from .models import Project, ProjectUser
@@ -5,6 +6,19 @@ from django.urls import reverse
 from rest_framework import status
 from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+import csv
+import json
+import os
+import tempfile
+from comments.models import Comment
+from task.models import Task
+from .roles import get_project_role, is_task_assignee
+from .testing import QueryBudgetMixin
+from .seed import populate_project
 
 
 class ProjectViewTests(APITestCase):
@@ -39,6 +53,24 @@ class ProjectViewTests(APITestCase):
         response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_executor['Authorization'])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_async_reads_match_sync(self):
+        header = self.auth_header_executor['Authorization']
+        outsider = User.objects.create_user(username="outsider", password="password", email="test4@example.com")
+        for sync_url, async_url in (
+            ('/api/projects/', reverse('projects_async')),
+            (f'/api/projects/{self.project.id}/', reverse('project_detail_async', kwargs={'project_id': self.project.id})),
+        ):
+            expected = self.client.get(sync_url, HTTP_AUTHORIZATION=header)
+            response = self.client.get(async_url, HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json(), expected.json())
+
+        url = reverse('project_detail_async', kwargs={'project_id': self.project.id})
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(outsider).access_token}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('project_detail_async', kwargs={'project_id': self.project.id + 1000}), HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_get_project_list(self):
         url = reverse('projects')
         
@@ -51,6 +83,47 @@ class ProjectViewTests(APITestCase):
         response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_executor['Authorization'])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
     
+    def test_get_project_denied_for_outsider(self):
+        outsider = User.objects.create_user(username="outsider", password="password", email="test4@example.com")
+        token = RefreshToken.for_user(outsider)
+        url = reverse('project_detail', kwargs={'project_id': self.project.id})
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {str(token.access_token)}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(reverse('projects'), HTTP_AUTHORIZATION=f'Bearer {str(token.access_token)}')
+        self.assertEqual(response.data, [])
+
+    def test_conditional_get(self):
+        url = f"/api/projects/{self.project.id}/"
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_creator['Authorization'])
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_creator['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_creator['Authorization'], HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        newcomer = User.objects.create_user(username="newcomer", password="password", email="test5@example.com")
+        ProjectUser.objects.upsert_members(self.project, {newcomer.id: "executor"})
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_creator['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(newcomer.id, response.data['staff'])
+
+        etag = response['ETag']
+        ProjectUser.objects.filter(user=newcomer).get().delete()
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_creator['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(newcomer.id, response.data['staff'])
+
+    def test_visibility_querysets(self):
+        self.assertTrue(Project.objects.visible_to(self.executor).filter(id=self.project.id).exists())
+        self.assertFalse(Project.objects.manageable_by(self.executor).filter(id=self.project.id).exists())
+        self.assertTrue(Project.objects.manageable_by(self.manager).filter(id=self.project.id).exists())
+        self.assertFalse(Project.objects.owned_by(self.manager).filter(id=self.project.id).exists())
+        self.assertTrue(Project.objects.owned_by(self.creator).filter(id=self.project.id).exists())
+
     def test_create_project(self):
         url = reverse('projects')
         data = {
@@ -86,6 +159,353 @@ class ProjectViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         
 
+    def test_sparse_fieldsets(self):
+        self.client.force_authenticate(user=self.creator)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/projects/', {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0]), {'id', 'name'})
+
+        response = self.client.get(f'/api/projects/async/{self.project.id}/', {'exclude': 'description,staff'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('staff', response.json())
+        self.assertEqual(response.json()['name'], self.project.name)
+
+
+class ProjectRoleCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="member", password="password", email="member@example.com")
+        self.project = Project.objects.create(name="Cached Project")
+        self.membership = ProjectUser.objects.create(user=self.user, project=self.project, role="executor")
+        self.task = Task.objects.create(title="Cached Task", project=self.project)
+
+    def test_role_checks_hit_cache(self):
+        self.assertEqual(get_project_role(self.user, self.project.id), "executor")
+        with self.assertNumQueries(0):
+            self.assertFalse(self.project.has_creator_access(self.user))
+            self.assertFalse(self.task.has_manager_access(self.user))
+            self.assertFalse(self.task.user_has_access(self.user))
+
+    def test_membership_change_invalidates_cache(self):
+        self.assertFalse(self.project.has_manager_access(self.user))
+        self.membership.role = "manager"
+        self.membership.save()
+        self.assertTrue(self.project.has_manager_access(self.user))
+
+        self.membership.delete()
+        self.assertIsNone(get_project_role(self.user, self.project.id))
+
+    def test_assignment_change_invalidates_cache(self):
+        self.assertFalse(is_task_assignee(self.user, self.task.id))
+        self.task.assigned_to.add(self.user)
+        self.assertTrue(is_task_assignee(self.user, self.task.id))
+        self.task.assigned_to.clear()
+        self.assertFalse(is_task_assignee(self.user, self.task.id))
+        self.user.tasks.add(self.task)
+        self.assertTrue(self.task.has_executor_access(self.user))
+
+
+class ProjectStaffTests(APITestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password", email="creator@example.com")
+        self.users = [
+            User.objects.create_user(username=f"user{i}", password="password", email=f"user{i}@example.com")
+            for i in range(5)
+        ]
+        self.project = Project.objects.create(name="Staff Project")
+        self.project.create_default_roles(self.creator)
+        self.client.force_authenticate(user=self.creator)
+        self.url = reverse('project_staff', kwargs={'project_id': self.project.id})
+
+    def test_bulk_upsert_and_remove(self):
+        data = {"staff": [{"user_id": user.id, "role": "executor"} for user in self.users]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ProjectUser.objects.filter(project=self.project, role="executor").count(), 5)
+
+        data = {
+            "staff": [{"user_id": self.users[0].id, "role": "manager"}],
+            "remove_staff": [self.users[1].id, self.users[2].id],
+        }
+        with self.assertNumQueries(12):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        roles = dict(ProjectUser.objects.filter(project=self.project).values_list("user_id", "role"))
+        self.assertEqual(roles[self.users[0].id], "manager")
+        self.assertNotIn(self.users[1].id, roles)
+        self.assertEqual(len(roles), 4)
+
+    def test_unknown_user_rejected_atomically(self):
+        data = {"staff": [{"user_id": self.users[0].id}, {"user_id": 999999}]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(ProjectUser.objects.filter(user=self.users[0]).exists())
+
+    def test_malformed_staff_entry_rejected(self):
+        user_id = self.users[0].id
+        for payload in (
+            {"staff": [user_id]},
+            {"staff": [{"user_id": user_id, "role": []}]},
+            {"staff": [{"user_id": [user_id], "role": "executor"}]},
+            {"staff": {"user_id": user_id}},
+            [{"user_id": user_id, "role": "executor"}],
+        ):
+            with self.subTest(payload=payload):
+                response = self.client.post(self.url, payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(f"/api/projects/{self.project.id}/", [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ProjectUser.objects.filter(user=self.users[0]).exists())
+
+    def test_creator_role_cannot_be_changed(self):
+        data = {"staff": [{"user_id": self.creator.id, "role": "executor"}]}
+        response = self.client.patch(f"/api/projects/{self.project.id}/", data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(self.project.has_creator_access(self.creator))
+
+
+class ProjectExportTests(APITestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password", email="creator@example.com")
+        self.executor = User.objects.create_user(username="executor", password="password", email="executor@example.com")
+        self.project = Project.objects.create(name="Export Project")
+        self.project.create_default_roles(self.creator)
+        ProjectUser.objects.create(user=self.executor, project=self.project, role="executor")
+        self.tasks = [Task.objects.create(title=f"Task {i}", project=self.project) for i in range(3)]
+        self.tasks[0].assigned_to.add(self.creator, self.executor)
+        Comment.objects.create(task=self.tasks[1], user=self.executor, text="Done, see attached")
+        self.url = reverse('project_export', kwargs={'project_id': self.project.id})
+
+    def test_export_ndjson(self):
+        self.client.force_authenticate(user=self.creator)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('project-', response["Content-Disposition"])
+
+        records = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record["record"] for record in records], ["project", "member", "member", "task", "task", "task", "comment"])
+        self.assertEqual(records[0]["name"], "Export Project")
+        self.assertEqual(records[2], {"record": "member", "user": "executor", "role": "executor"})
+        self.assertEqual(sorted(records[3]["assigned_to"]), ["creator", "executor"])
+        self.assertEqual(records[6]["task"], self.tasks[1].id)
+        self.assertEqual(records[6]["user"], "executor")
+
+    def test_export_csv_matches_command(self):
+        self.client.force_authenticate(user=self.creator)
+        response = self.client.get(self.url, {"output": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[3]["title"], "Task 0")
+        self.assertEqual(sorted(rows[3]["assigned_to"].split()), ["creator", "executor"])
+
+        output = StringIO()
+        call_command("export_project", self.project.id, output="csv", chunk_size=1, stdout=output)
+        self.assertEqual(output.getvalue(), content)
+
+    async def test_export_streams_under_asgi(self):
+        token = await sync_to_async(RefreshToken.for_user)(self.creator)
+        response = await self.async_client.get(self.url, headers={"authorization": f"Bearer {token.access_token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual([json.loads(line)["record"] for line in content.splitlines()], ["project", "member", "member", "task", "task", "task", "comment"])
+
+    def test_export_requires_manager(self):
+        self.client.force_authenticate(user=self.executor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.creator)
+        response = self.client.get(self.url, {"output": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProjectImportTests(APITestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="password", email="creator@example.com")
+        self.executor = User.objects.create_user(username="executor", password="password", email="executor@example.com")
+        self.project = Project.objects.create(name="Source Project", description="Imported")
+        self.project.create_default_roles(self.creator)
+        ProjectUser.objects.create(user=self.executor, project=self.project, role="executor")
+        populate_project(self.project, [self.creator.id, self.executor.id], tasks=5, comments=2, assignees=2)
+
+    def export(self):
+        output = StringIO()
+        call_command("export_project", self.project.id, stdout=output)
+        return output.getvalue()
+
+    def test_round_trip(self):
+        dump = self.export()
+        path = self.tmp_file(dump)
+        output = StringIO()
+        call_command("import_project", path, chunk_size=2, stdout=output)
+        self.assertIn("tasks: 5", output.getvalue())
+
+        copy = Project.objects.exclude(id=self.project.id).get()
+        self.assertEqual(copy.name, "Source Project")
+        self.assertTrue(copy.has_creator_access(self.creator))
+        self.assertEqual(Task.objects.filter(project=copy).count(), 5)
+        self.assertEqual(Task.assigned_to.through.objects.filter(task__project=copy).count(), 10)
+        self.assertEqual(Comment.objects.filter(task__project=copy).count(), 10)
+        source = Task.objects.filter(project=self.project).order_by("id").first()
+        imported = Task.objects.filter(project=copy).order_by("id").first()
+        self.assertEqual(imported.created_at, source.created_at)
+        self.assertEqual(imported.comments.count(), 2)
+
+        exported_again = StringIO()
+        call_command("export_project", copy.id, stdout=exported_again)
+        strip_ids = lambda text: [
+            {key: value for key, value in json.loads(line).items() if key not in ("id", "task")}
+            for line in text.splitlines()
+        ]
+        self.assertEqual(strip_ids(exported_again.getvalue()), strip_ids(dump))
+
+    def test_unknown_user_rolls_back(self):
+        dump = self.export().replace('"user": "executor"', '"user": "ghost"')
+        with self.assertRaisesMessage(CommandError, "ghost"):
+            call_command("import_project", self.tmp_file(dump), stdout=StringIO())
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertEqual(Task.objects.count(), 5)
+
+    def test_imported_members_see_the_project(self):
+        self.assertEqual(get_project_role(self.executor, self.project.id), "executor")
+        call_command("import_project", self.tmp_file(self.export()), stdout=StringIO())
+        copy = Project.objects.exclude(id=self.project.id).get()
+        self.assertEqual(get_project_role(self.executor, copy.id), "executor")
+
+    def test_malformed_records_are_rejected(self):
+        dump = self.export()
+        member = '{"record": "member", "user": "executor", "role": "executor"}'
+        self.assertIn(member, dump)
+        broken = {
+            "expected a username": dump.replace(member, '{"record": "member", "role": "executor"}'),
+            "unknown role": dump.replace(member, '{"record": "member", "user": "executor", "role": "owner"}'),
+            "already a member": dump.replace(member, member + "\n" + member),
+        }
+        for message, content in broken.items():
+            with self.subTest(message), self.assertRaisesMessage(CommandError, message):
+                call_command("import_project", self.tmp_file(content), stdout=StringIO())
+        comment = json.dumps({"record": "comment", "id": 1, "task": 1, "text": "No author"})
+        with self.assertRaisesMessage(CommandError, "expected a username"):
+            call_command("import_project", self.tmp_file(dump + comment + "\n"), stdout=StringIO())
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_task_fields_are_validated(self):
+        dump = self.export()
+        line_number = len(dump.splitlines()) + 1
+        task = {"record": "task", "id": 999, "title": "Extra", "description": "", "assigned_to": []}
+        broken = {
+            "status": dict(task, status="bogus"),
+            "title": dict(task, title="x" * 256),
+        }
+        for field, record in broken.items():
+            with self.subTest(field), self.assertRaisesMessage(CommandError, f"line {line_number}: {field}"):
+                call_command("import_project", self.tmp_file(dump + json.dumps(record) + "\n"), stdout=StringIO())
+        self.assertEqual(Project.objects.count(), 1)
+
+        repeated = dict(task, status="completed", assigned_to=["executor", "executor"])
+        call_command("import_project", self.tmp_file(dump + json.dumps(repeated) + "\n"), stdout=StringIO())
+        imported = Task.objects.get(project__in=Project.objects.exclude(id=self.project.id), title="Extra")
+        self.assertEqual(list(imported.assigned_to.values_list("username", flat=True)), ["executor"])
+
+    def tmp_file(self, content):
+        handle, path = tempfile.mkstemp(suffix=".ndjson")
+        with os.fdopen(handle, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+
+class LoadToolingTests(APITestCase):
+    def test_seed_load_and_benchmark(self):
+        call_command("seed_load", users=6, projects=2, members=4, tasks=5, comments=2, assignees=2, stdout=StringIO())
+        self.assertEqual(Project.objects.count(), 2)
+        self.assertEqual(ProjectUser.objects.filter(role="creator").count(), 2)
+        self.assertEqual(Task.objects.count(), 10)
+        self.assertEqual(Task.assigned_to.through.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 20)
+
+        output = StringIO()
+        call_command("benchmark", iterations=2, serialization=5, stdout=output, stderr=StringIO())
+        report = output.getvalue()
+        self.assertIn("tasks (TaskSerializer)", report)
+        self.assertIn("GET /api/task/", report)
+        self.assertIn("POST /api/task/batch/", report)
+        self.assertEqual(Project.objects.count(), 2)
+
+        with self.assertRaises(CommandError):
+            call_command("seed_load", users=0, projects=1, members=0, tasks=2, comments=2, stdout=StringIO())
+        project = Project.objects.create(name="Empty project")
+        counts = populate_project(project, [], tasks=2, comments=2, assignees=2)
+        self.assertEqual(counts, {"tasks": 2, "assignments": 0, "comments": 0})
+        self.assertEqual(set(project.tasks.values_list("comment_count", flat=True)), {0})
+
+
+class ProjectQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="budget", password="password", email="budget@example.com")
+        self.project = Project.objects.create(name="Budget Project")
+        self.project.create_default_roles(self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def add_members(self, project, size):
+        offset = User.objects.count()
+        users = User.objects.bulk_create([
+            User(username=f"member{offset + i}", email=f"member{offset + i}@example.com")
+            for i in range(size)
+        ])
+        ProjectUser.objects.bulk_create([ProjectUser(user=user, project=project, role="executor") for user in users])
+
+    def test_project_list_query_count(self):
+        def grow(size):
+            for i in range(size):
+                project = Project.objects.create(name=f"Project {size}-{i}")
+                project.create_default_roles(self.user)
+                self.add_members(project, 2)
+
+        self.assertQueryCountConstant(reverse('projects'), grow)
+
+    def test_project_detail_query_count(self):
+        url = f"/api/projects/{self.project.id}/"
+        self.assertQueryCountConstant(url, lambda size: self.add_members(self.project, size))
+        self.assertQueryCountConstant(f"/api/projects/time/{self.project.id}/", lambda size: self.add_members(self.project, size))
+
+    def test_dashboard_query_count(self):
+        def grow(size):
+            for i in range(size):
+                project = Project.objects.create(name=f"Project {size}-{i}")
+                project.create_default_roles(self.user)
+                populate_project(project, [self.user.id], tasks=3, comments=0, assignees=1)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('project_dashboard'))
+        self.assertQueryCountConstant(reverse('project_dashboard'), grow)
+
+    def test_dashboard_counts(self):
+        self.add_members(self.project, 2)
+        Task.objects.create(title="Late", project=self.project, status="in_progress", due_date=timezone.now() - timezone.timedelta(days=1))
+        Task.objects.create(title="Done late", project=self.project, status="completed", due_date=timezone.now() - timezone.timedelta(days=1))
+        Task.objects.create(title="New", project=self.project)
+
+        response = self.client.get(reverse('project_dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        dashboard = response.data[0]
+        self.assertEqual(dashboard['task_count'], 3)
+        self.assertEqual(dashboard['task_counts'], {'new': 1, 'in_progress': 1, 'on_checking': 0, 'completed': 1, 'canceled': 0})
+        self.assertEqual(dashboard['overdue_count'], 1)
+        self.assertEqual(dashboard['member_count'], 3)
+        self.assertIn('time_since_start', dashboard)
+
+    def test_membership_lookup_uses_index(self):
+        queryset = ProjectUser.objects.filter(user_id=self.user.id, project_id=self.project.id)
+        self.assertUsesIndex(queryset, ["user_id", "project_id"])
+
+
 # class ProjectStaffPatchTests(APITestCase):
 #     def setUp(self):
 #         self.creator = User.objects.create_user(username="creator", password="pass123")
@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import ProjectView, ProjectTimeTrackingAPIView
+from .views import ProjectView, ProjectTimeTrackingAPIView, ProjectStaffView, ProjectDashboardView, ProjectAsyncView, ProjectExportView
 
 urlpatterns = [
     path('', ProjectView.as_view(), name='projects'),
+    path('dashboard/', ProjectDashboardView.as_view(), name='project_dashboard'),
+    path('async/', ProjectAsyncView.as_view(), name='projects_async'),
+    path('async/<int:project_id>/', ProjectAsyncView.as_view(), name='project_detail_async'),
     path('<int:project_id>/', ProjectView.as_view(), name='project_detail'),
     path('time/<int:project_id>/', ProjectTimeTrackingAPIView.as_view(), name='project_detail'),
+    path('<int:project_id>/export/', ProjectExportView.as_view(), name='project_export'),
+    path('<int:project_id>/staff/', ProjectStaffView.as_view(), name='project_staff'),
 ]
@@ -3,15 +3,104 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from django.db import transaction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from .models import Project, ProjectUser
 from auth_app.models import User
+from task.models import Task
 from .serializers import ProjectSerializer
+from .export import EXPORT_FORMATS, astream_export, export_records
+from activity.recorder import members_changed
+from project_manager.async_views import AsyncAPIView
+from project_manager.fieldsets import DETAIL_COLUMNS, requested_fields, only_fields
+from project_manager.conditional import make_etag, list_etag, alist_etag, not_modified, with_validators
 from django.utils.timezone import now
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
+def project_time_info(project):
+    return {
+        'name': project.name,
+        'start_date': project.start_date,
+        'end_date': project.end_date,
+        'time_since_start': (now() - project.start_date).total_seconds(),
+        'time_since_end': (now() - project.end_date).total_seconds() if project.end_date else None,
+        'time_remaining': (project.end_date - now()).total_seconds() if project.end_date else None,
+    }
+
+
+def parse_staff_changes(data):
+    if not isinstance(data, dict):
+        return None, None, Response({"error": "Expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+
+    allowed_roles = {"manager", "executor"}
+    staff = data.get("staff", None) or []
+    removed = data.get("remove_staff", None) or []
+    if not isinstance(staff, list) or not isinstance(removed, list):
+        return None, None, Response({"error": "staff and remove_staff must be lists"}, status=status.HTTP_400_BAD_REQUEST)
+
+    members = {}
+    for user_data in staff:
+        if not isinstance(user_data, dict):
+            return None, None, Response({"error": "Each staff entry must be an object with user_id and role"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = user_data.get("user_id")
+        role = user_data.get("role", "executor")
+
+        if not user_id:
+            return None, None, Response({"error": "User ID is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(role, str) or role not in allowed_roles:
+            return None, None, Response({"error": f"Invalid role '{role}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            members[int(user_id)] = role
+        except (TypeError, ValueError):
+            return None, None, Response({"error": "User IDs must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        removed = [int(user_id) for user_id in removed]
+    except (TypeError, ValueError):
+        return None, None, Response({"error": "User IDs must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_ids = set(members) | set(removed)
+    if not user_ids:
+        return members, removed, None
+
+    missing = user_ids - set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    if missing:
+        missing = ", ".join(str(user_id) for user_id in sorted(missing))
+        return None, None, Response({"error": f"Users not found: {missing}"}, status=status.HTTP_404_NOT_FOUND)
+
+    return members, removed, None
+
+
+def apply_staff_changes(project, members, removed):
+    """Must run inside a transaction, returns an error response if nothing could be changed."""
+    user_ids = set(members) | set(removed)
+    if not user_ids:
+        return None
+
+    # Staff changes of one project are serialized on the project row, so
+    # the roles read here are still current when they are logged.
+    Project.objects.select_for_update().filter(pk=project.pk).values_list("pk").first()
+    roles = dict(project.projectuser_set.filter(user_id__in=user_ids).values_list("user_id", "role"))
+    if "creator" in roles.values():
+        return Response({"error": "The project creator's role cannot be changed"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if members:
+        ProjectUser.objects.upsert_members(project, members)
+        # The upsert is a bulk write, so it is logged here rather than by signals.
+        members_changed(project.id, roles, members)
+    if removed:
+        ProjectUser.objects.remove_members(project, removed)
+    return None
+
+
 class ProjectView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -24,6 +113,18 @@ class ProjectView(APIView):
                 description="Project ID",
                 type=openapi.TYPE_INTEGER,
             ),
+            openapi.Parameter(
+                name="fields",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. id,title,status",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="exclude",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated fields to leave out",
+                type=openapi.TYPE_STRING,
+            ),
         ],
         responses={
             200: ProjectSerializer(),
@@ -39,19 +140,26 @@ class ProjectView(APIView):
         }
     )
     def get(self, request, project_id=None):
+        selected = requested_fields(request, ProjectSerializer)
         if project_id:
-            project = get_object_or_404(Project, id=project_id)
-            if request.user.is_superuser or request.user in project.staff.all():
-                return Response(ProjectSerializer(project).data)
-            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+            project = get_object_or_404(only_fields(Project.objects.with_access(request.user), selected, DETAIL_COLUMNS), id=project_id)
+            if not project.can_view:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = make_etag("project", project.id, project.updated_at.isoformat(), *(selected or ()))
+            cached = not_modified(request, etag, project.updated_at)
+            if cached is not None:
+                return cached
+            return with_validators(Response(ProjectSerializer(project, fields=selected).data), etag, project.updated_at)
         
-        if request.user.is_superuser:
-            projects = Project.objects.all()
-        else:
-            projects = Project.objects.filter(staff=request.user)
+        projects = only_fields(Project.objects.with_staff().visible_to(request.user), selected)
+        etag = list_etag(request, projects)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
         
-        serializer = ProjectSerializer(projects, many=True)
-        return Response(serializer.data)
+        serializer = ProjectSerializer(projects, many=True, fields=selected)
+        return with_validators(Response(serializer.data), etag)
     
 
     @swagger_auto_schema(
@@ -135,27 +243,17 @@ class ProjectView(APIView):
         if not (project.has_creator_access(request.user) or request.user.is_superuser):
             return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
         
-        allowed_roles = {"manager", "executor"}
-        staff_data = request.data.get("staff", [])
-        if staff_data:
-            for user_data in staff_data:
-                user_id = user_data.get("user_id")
-                role = user_data.get("role", "executor")
-
-                if not user_id:
-                    return Response({"error": "User ID is required"}, status=status.HTTP_400_BAD_REQUEST)
-                
-                if role not in allowed_roles:
-                    return Response({"error": f"Invalid role '{role}'"}, status=status.HTTP_400_BAD_REQUEST)
-
-                user = get_object_or_404(User, id=user_id)
-
-                ProjectUser.objects.get_or_create(user=user, project=project, role=role)
-
+        members, removed, error = parse_staff_changes(request.data)
+        if error:
+            return error
 
         serializer = ProjectSerializer(project, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                error = apply_staff_changes(project, members, removed)
+                if error:
+                    return error
+                serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
@@ -245,20 +343,205 @@ class ProjectTimeTrackingAPIView(APIView):
         }
     )
     def get(self, request, project_id):
-        project = get_object_or_404(Project, id=project_id)
-        user = request.user
+        project = get_object_or_404(Project.objects.with_access(request.user), id=project_id)
 
-        if user not in project.staff.all() and not user.is_superuser:
+        if not project.can_view:
             return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
 
         return Response(self.get_project_time_info(project), status=status.HTTP_200_OK)
     
     def get_project_time_info(self, project):
+        return project_time_info(project)
+
+
+class ProjectStaffView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Add, update or remove project members in one call",
+        manual_parameters=[
+            openapi.Parameter(
+                name="project_id",
+                in_=openapi.IN_PATH,
+                description="Project ID",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="Authorization",
+                in_=openapi.IN_HEADER,
+                description="JWT token format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'staff': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'user_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="User ID"),
+                            'role': openapi.Schema(type=openapi.TYPE_STRING, description="manager or executor"),
+                        },
+                    ),
+                ),
+                'remove_staff': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    description="IDs of users to remove from the project",
+                ),
+            },
+        ),
+        responses={
+            200: openapi.Response(description="Current project members"),
+            400: openapi.Response(description="Bad request"),
+            403: openapi.Response(description="Access denied"),
+            404: openapi.Response(description="Project or users not found"),
+        }
+    )
+    def post(self, request, project_id):
+        project = get_object_or_404(Project, id=project_id)
+
+        if not (project.has_creator_access(request.user) or request.user.is_superuser):
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        members, removed, error = parse_staff_changes(request.data)
+        if error:
+            return error
+
+        with transaction.atomic():
+            error = apply_staff_changes(project, members, removed)
+        if error:
+            return error
+
+        staff = project.projectuser_set.order_by("id").values("user_id", "role")
+        return Response({"staff": list(staff)})
+
+
+class ProjectExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Stream the project with its members, tasks and comments as NDJSON or CSV",
+        manual_parameters=[
+            openapi.Parameter(
+                name="project_id",
+                in_=openapi.IN_PATH,
+                description="Project ID",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="output",
+                in_=openapi.IN_QUERY,
+                description="ndjson (default) or csv",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="Authorization",
+                in_=openapi.IN_HEADER,
+                description="JWT token format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: openapi.Response(description="One record per line: project, member, task or comment"),
+            400: openapi.Response(description="Unknown output format"),
+            403: openapi.Response(description="Access denied"),
+            404: openapi.Response(description="Project not found"),
+        }
+    )
+    def get(self, request, project_id):
+        project = get_object_or_404(Project.objects.with_access(request.user), id=project_id)
+
+        if not project.can_manage:
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response({"error": f"Unknown output format, use one of: {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        write_lines, content_type = EXPORT_FORMATS[output]
+        records = export_records(project, settings.EXPORT_CHUNK_SIZE)
+        if isinstance(request._request, ASGIRequest):
+            content = astream_export(write_lines, records)
+        else:
+            content = write_lines(records)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="project-{project.id}.{output}"'
+        return response
+
+
+class ProjectDashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Task status counts, overdue count, member count and time tracking for every visible project",
+        manual_parameters=[
+            openapi.Parameter(
+                name="Authorization",
+                in_=openapi.IN_HEADER,
+                description="JWT token format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description="Project dashboard",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'id': openapi.Schema(type=openapi.TYPE_INTEGER, description="Project ID"),
+                            'task_count': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of tasks"),
+                            'task_counts': openapi.Schema(type=openapi.TYPE_OBJECT, description="Number of tasks per status"),
+                            'overdue_count': openapi.Schema(type=openapi.TYPE_INTEGER, description="Open tasks past their due date"),
+                            'member_count': openapi.Schema(type=openapi.TYPE_INTEGER, description="Number of project members"),
+                        },
+                    ),
+                ),
+            ),
+        }
+    )
+    def get(self, request):
+        projects = Project.objects.visible_to(request.user).with_dashboard_counts().order_by('id')
+        return Response([self.get_dashboard_info(project) for project in projects])
+
+    def get_dashboard_info(self, project):
         return {
-            'name': project.name,
-            'start_date': project.start_date,
-            'end_date': project.end_date,
-            'time_since_start': (now() - project.start_date).total_seconds(),
-            'time_since_end': (now() - project.end_date).total_seconds() if project.end_date else None,
-            'time_remaining': (project.end_date - now()).total_seconds() if project.end_date else None,
-        }
\ No newline at end of file
+            'id': project.id,
+            **project_time_info(project),
+            'task_count': project.task_count,
+            'task_counts': {status: getattr(project, f'{status}_count') for status, _ in Task.STATUS_CHOICES},
+            'overdue_count': project.overdue_count,
+            'member_count': project.member_count,
+        }
+
+
+class ProjectAsyncView(AsyncAPIView):
+    async def get(self, request, project_id=None):
+        selected = requested_fields(request, ProjectSerializer)
+        if project_id:
+            projects = Project.objects.with_staff().with_access(request.user)
+            project = await aget_object_or_404(only_fields(projects, selected, DETAIL_COLUMNS), id=project_id)
+            if not project.can_view:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = make_etag("project", project.id, project.updated_at.isoformat(), *(selected or ()))
+            cached = not_modified(request, etag, project.updated_at)
+            if cached is not None:
+                return cached
+            return with_validators(Response(ProjectSerializer(project, fields=selected).data), etag, project.updated_at)
+
+        projects = only_fields(Project.objects.with_staff().visible_to(request.user), selected)
+        etag = await alist_etag(request, projects)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        serializer = ProjectSerializer([project async for project in projects], many=True, fields=selected)
+        return with_validators(Response(serializer.data), etag)
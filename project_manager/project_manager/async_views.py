@@ -0,0 +1,65 @@
+from asgiref.sync import sync_to_async
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of APIView. Authentication, permissions, exception
+    handling and rendering behave like the sync views, while handlers are
+    coroutines that use the async ORM.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    # No content negotiation, the first configured renderer is used.
+    renderer_class = api_settings.DEFAULT_RENDERER_CLASSES[0]
+    http_method_names = ['get', 'head']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like APIView, CSRF only matters for session authentication.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[auth() for auth in self.authentication_classes],
+        )
+        try:
+            await sync_to_async(self.initial)(request)
+            method = request.method.lower()
+            handler = getattr(self, 'get' if method == 'head' else method, None)
+            if method not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc, request)
+        return self.finalize_response(request, response)
+
+    def initial(self, request):
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, exc, request):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication_classes[0]().authenticate_header(request)
+        response = exception_handler(exc, {'view': self, 'request': request})
+        if response is None:
+            raise exc
+        response.exception = True
+        return response
+
+    def finalize_response(self, request, response):
+        response.accepted_renderer = self.renderer_class()
+        response.accepted_media_type = self.renderer_class.media_type
+        response.renderer_context = {'view': self, 'request': request, 'response': response}
+        return response
@@ -0,0 +1,62 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def list_etag(request, queryset, field="updated_at"):
+    """
+    ETag for the first page of a list endpoint, computed with one aggregate
+    query over the whole queryset: the newest ``field`` value and the row
+    count, so deleted rows change it too. Lists send no Last-Modified since
+    deletes never move it. Cursor pages get no validators and skip the
+    aggregate.
+    """
+    if request.query_params.get("cursor"):
+        return None
+    summary = queryset.order_by().aggregate(last_modified=Max(field), total=Count("pk"))
+    return summary_etag(request, summary)
+
+
+async def alist_etag(request, queryset, field="updated_at"):
+    if request.query_params.get("cursor"):
+        return None
+    summary = await queryset.order_by().aaggregate(last_modified=Max(field), total=Count("pk"))
+    return summary_etag(request, summary)
+
+
+def summary_etag(request, summary):
+    return make_etag(request.user.id, request.get_full_path(), summary["last_modified"], summary["total"])
+
+
+def not_modified(request, etag, last_modified=None):
+    if etag is None:
+        return None
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        matched = "*" in etags or etag in etags
+    else:
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        matched = since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+    if matched:
+        return with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+    return None
+
+
+def with_validators(response, etag, last_modified=None):
+    if etag is not None:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Authorization"])
+    return response
@@ -0,0 +1,58 @@
+from rest_framework.exceptions import ValidationError
+
+# Detail views always read these for their ETag and Last-Modified headers.
+DETAIL_COLUMNS = ("id", "updated_at")
+
+
+class SparseFieldsMixin:
+    """Serializer that outputs only the field names passed as ``fields``."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def split_param(request, name):
+    value = request.query_params.get(name, "")
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def requested_fields(request, serializer_class):
+    """
+    Field names picked with ``?fields=`` and/or ``?exclude=``, in serializer
+    order, or None when the full representation is wanted.
+    """
+    fields = split_param(request, "fields")
+    exclude = split_param(request, "exclude")
+    if not fields and not exclude:
+        return None
+
+    available = list(serializer_class().fields)
+    for param, names in (("fields", fields), ("exclude", exclude)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"})
+    return [name for name in available if (not fields or name in fields) and name not in exclude]
+
+
+def only_fields(queryset, selected, required=("id",)):
+    """
+    Defers the columns a sparse fieldset does not output and drops the
+    many-to-many prefetch when no relation is asked for. ``required`` keeps
+    the columns the view reads itself (ETags, cursor positions).
+    """
+    if selected is None:
+        return queryset
+    opts = queryset.model._meta
+    columns = set(required)
+    relations = False
+    for name in selected:
+        field = opts.get_field(name)
+        if field.many_to_many:
+            relations = True
+        elif field.concrete:
+            columns.add(name)
+    queryset = queryset.only(*columns)
+    return queryset if relations else queryset.prefetch_related(None)
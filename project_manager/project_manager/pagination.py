@@ -0,0 +1,137 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks past the last row of the previous page
+    instead of using OFFSET, so every page costs the same. The last
+    ordering field must be unique (usually ``id``). Fields listed in
+    ``nullable`` sort their NULLs last in both directions.
+    """
+    ordering = ('id',)
+    nullable = ()
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = self.get_page_queryset(queryset, request)
+        return self.get_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = self.get_page_queryset(queryset, request)
+        return self.get_page([row async for row in queryset[:self.page_size + 1]])
+
+    def get_page_queryset(self, queryset, request):
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.seek_filter(position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor')
+        return queryset.order_by(*self.get_order_by())
+
+    def get_order_by(self):
+        order_by = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if name not in self.nullable:
+                order_by.append(field)
+            elif field.startswith('-'):
+                order_by.append(F(name).desc(nulls_last=True))
+            else:
+                order_by.append(F(name).asc(nulls_last=True))
+        return order_by
+
+    def get_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = [self.get_position_value(last, field) for field in self.fields]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    @property
+    def fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def get_position_value(self, row, field):
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def seek_filter(self, position):
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            if position[index] is None:
+                # NULLs sort last, only the following fields can move past them.
+                continue
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': position[index]})
+            if name in self.nullable:
+                condition |= Q(**{f'{name}__isnull': True})
+            for previous, value in zip(self.fields[:index], position):
+                condition &= Q(**{previous: value})
+            conditions.append(condition)
+        return reduce(lambda left, right: left | right, conditions)
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return position
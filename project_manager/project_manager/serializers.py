@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a ModelSerializer on list endpoints. Rows are
+    read with values() and turned into the same dicts without running every
+    field's to_representation; datetimes are left for the renderer.
+    Many-to-many fields become lists of ids, loaded with one query per page.
+    """
+    serializer_class = None
+
+    def __init__(self, fields=None):
+        self.fields = fields if fields is not None else list(self.serializer_class().fields)
+        opts = self.serializer_class.Meta.model._meta
+        self.columns = {}
+        self.relations = {}
+        for name in self.fields:
+            field = opts.get_field(name)
+            if field.many_to_many:
+                self.relations[name] = field
+            else:
+                self.columns[name] = field.attname
+
+    def values(self, queryset, required=()):
+        columns = dict.fromkeys([*self.columns.values(), "id", *required])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def related_queryset(self, field, rows):
+        through = field.remote_field.through
+        source, target = f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+        ids = [row["id"] for row in rows]
+        return through.objects.filter(**{f"{source}__in": ids}).order_by(target).values_list(source, target)
+
+    def to_representation(self, rows):
+        related = {}
+        for name, field in self.relations.items():
+            related[name] = defaultdict(list)
+            for owner, target in self.related_queryset(field, rows):
+                related[name][owner].append(target)
+        return self.build(rows, related)
+
+    async def ato_representation(self, rows):
+        related = {}
+        for name, field in self.relations.items():
+            related[name] = defaultdict(list)
+            async for owner, target in self.related_queryset(field, rows):
+                related[name][owner].append(target)
+        return self.build(rows, related)
+
+    def build(self, rows, related):
+        columns = self.columns
+        return [
+            {
+                name: row[columns[name]] if name in columns else related[name].get(row["id"], [])
+                for name in self.fields
+            }
+            for row in rows
+        ]
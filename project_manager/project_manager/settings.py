@@ -49,6 +49,9 @@ INSTALLED_APPS = [
     'project',
     'task',
     'comments',
+    'realtime',
+    'search',
+    'activity',
     'drf_yasg',
 ]
 
@@ -63,23 +66,81 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
+    "TOKEN_REFRESH_SERIALIZER": "auth_app.serializers.ClaimsTokenRefreshSerializer",
 }
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_app.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Both use orjson when it is installed and the stdlib json otherwise.
+    'DEFAULT_RENDERER_CLASSES': (
+        'project_manager.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'project_manager.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+LOGIN_HASHER_WORKERS = int(os.getenv('LOGIN_HASHER_WORKERS', os.cpu_count() or 2))
+
+LOGIN_HASHER_QUEUE = int(os.getenv('LOGIN_HASHER_QUEUE', 32))
+
+# Login attempts per minute, counted per client IP and per username.
+LOGIN_USERNAME_RATE = int(os.getenv('LOGIN_USERNAME_RATE', 10))
+
+LOGIN_IP_RATE = int(os.getenv('LOGIN_IP_RATE', 60))
+
+TASK_PAGE_SIZE = int(os.getenv('TASK_PAGE_SIZE', 100))
+
+COMMENT_PAGE_SIZE = int(os.getenv('COMMENT_PAGE_SIZE', 100))
+
+TASK_BATCH_MAX_SIZE = int(os.getenv('TASK_BATCH_MAX_SIZE', 500))
+
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 100))
+
+# Every page re-ranks everything before it, so deep offsets are refused.
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 1000))
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+ACTIVITY_PAGE_SIZE = int(os.getenv('ACTIVITY_PAGE_SIZE', 50))
+
+PROJECT_ROLE_CACHE_TIMEOUT = int(os.getenv('PROJECT_ROLE_CACHE_TIMEOUT', 300))
+
+# The in-memory broker only reaches clients connected to the same process.
+# With Redis configured, events go through Redis pub/sub, so the REST API
+# and the event stream can run in separate services with several workers.
+REALTIME_BROKER = os.getenv(
+    'REALTIME_BROKER',
+    'realtime.brokers.RedisBroker' if os.getenv('REDIS_URL') else 'realtime.brokers.InMemoryBroker',
+)
+
+REALTIME_REDIS_URL = os.getenv('REALTIME_REDIS_URL', os.getenv('REDIS_URL'))
+
+REALTIME_REDIS_CHANNEL = os.getenv('REALTIME_REDIS_CHANNEL', 'realtime:events')
+
+REALTIME_QUEUE_SIZE = int(os.getenv('REALTIME_QUEUE_SIZE', 100))
+
+REALTIME_KEEPALIVE = int(os.getenv('REALTIME_KEEPALIVE', 15))
+
+REALTIME_RETRY_MS = int(os.getenv('REALTIME_RETRY_MS', 3000))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'activity.middleware.ActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -104,6 +165,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'project_manager.wsgi.application'
 
+ASGI_APPLICATION = 'project_manager.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -119,6 +182,32 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Users are resolved from the token claims only when the claims versions
+# live in a cache shared by every worker. A per-process cache would miss
+# version bumps made by other workers.
+AUTH_CLAIMS_FAST_PATH = os.getenv('AUTH_CLAIMS_FAST_PATH', '1' if os.getenv('REDIS_URL') else '0') == '1'
+
+# Blacklisted refresh token JTIs are answered from the shared cache instead
+# of a database lookup per refresh. Requires a cache shared by every worker.
+TOKEN_BLACKLIST_SHARED_CACHE = os.getenv('TOKEN_BLACKLIST_SHARED_CACHE', '1' if os.getenv('REDIS_URL') else '0') == '1'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -21,6 +21,9 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('auth_app.urls')),
     path('api/projects/', include('project.urls')),
+    path('api/projects/', include('activity.urls')),
     path('api/task/', include('task.urls')),
+    path('api/realtime/', include('realtime.urls')),
+    path('api/search/', include('search.urls')),
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
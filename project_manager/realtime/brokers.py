@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import cache, cached_property
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        # A slow client loses its oldest events instead of growing without bound.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    def subscribe(self, channels):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def publish(self, channels, event):
+        raise NotImplementedError
+
+    def has_subscribers(self):
+        return True
+
+
+class InMemoryBroker(BaseBroker):
+    """
+    Fans events out to subscribers of the current process. Subscribing
+    happens on the event loop, publishing may happen from any thread.
+    """
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.REALTIME_QUEUE_SIZE
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = set().union(*(self._channels.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop is already closed.
+                subscription.close()
+
+    def has_subscribers(self):
+        return bool(self._channels)
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Shares events between processes through Redis pub/sub, so the app can
+    run several workers. Every event goes to one Redis channel; each process
+    starts listening on it with its first subscriber and fans the events out
+    to its own clients like InMemoryBroker.
+    """
+    def __init__(self, queue_size=None, url=None, channel=None):
+        super().__init__(queue_size)
+        self.url = url or settings.REALTIME_REDIS_URL
+        self.channel = channel or settings.REALTIME_REDIS_CHANNEL
+        self._listener = None
+
+    @cached_property
+    def client(self):
+        import redis
+        return redis.Redis.from_url(self.url)
+
+    def subscribe(self, channels):
+        subscription = super().subscribe(channels)
+        listener = self._listener
+        if listener is None or listener.done() or listener.get_loop() is not subscription.loop:
+            self._listener = subscription.loop.create_task(self.listen())
+        return subscription
+
+    async def listen(self):
+        import redis.asyncio
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.receive(message["data"])
+            except redis.RedisError:
+                logger.exception("Lost the realtime Redis subscription, reconnecting")
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+    def receive(self, data):
+        message = json.loads(data)
+        super().publish(message["channels"], message["event"])
+
+    def publish(self, channels, event):
+        import redis
+        data = json.dumps({"channels": list(channels), "event": event}, cls=DjangoJSONEncoder)
+        try:
+            self.client.publish(self.channel, data)
+        except redis.RedisError:
+            # Called after the write committed, a lost event must not fail the request.
+            logger.exception("Could not publish a realtime event")
+
+    def has_subscribers(self):
+        import redis
+        try:
+            return any(count for _, count in self.client.pubsub_numsub(self.channel))
+        except redis.RedisError:
+            return False
+
+
+@cache
+def get_broker():
+    return import_string(settings.REALTIME_BROKER)()
@@ -0,0 +1,52 @@
+from comments.serializers import CommentSerializer
+from task.models import Task
+from task.serializers import TaskSerializer
+from .brokers import get_broker
+
+
+def channels_for(project_id, task_id):
+    return [f"project:{project_id}", f"task:{task_id}"]
+
+
+def publish(event, project_id, task_id):
+    get_broker().publish(channels_for(project_id, task_id), event)
+
+
+def publish_task_data(action, tasks_data):
+    broker = get_broker()
+    for data in tasks_data:
+        broker.publish(channels_for(data["project"], data["id"]), {
+            "event": f"task.{action}",
+            "project": data["project"],
+            "task": data["id"],
+            "data": data,
+        })
+
+
+def publish_tasks(action, task_ids):
+    if not get_broker().has_subscribers():
+        return
+    tasks = Task.objects.with_assignees().filter(pk__in=task_ids).order_by("id")
+    publish_task_data(action, TaskSerializer(tasks, many=True).data)
+
+
+def publish_task_deleted(task_id, project_id):
+    publish({
+        "event": "task.deleted",
+        "project": project_id,
+        "task": task_id,
+        "data": {"id": task_id, "project": project_id},
+    }, project_id, task_id)
+
+
+def publish_comment(action, comment, project_id):
+    if action == "deleted":
+        data = {"id": comment.id, "task": comment.task_id}
+    else:
+        data = CommentSerializer(comment).data
+    publish({
+        "event": f"comment.{action}",
+        "project": project_id,
+        "task": comment.task_id,
+        "data": data,
+    }, project_id, comment.task_id)
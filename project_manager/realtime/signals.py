@@ -0,0 +1,53 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from comments.models import Comment
+from task.models import Task
+from .brokers import get_broker
+from .events import publish_comment, publish_task_deleted, publish_tasks
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    action = "created" if created else "updated"
+    transaction.on_commit(partial(publish_tasks, action, [instance.pk]))
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assignments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_clear":
+        task_ids = getattr(instance, "_cleared_assignment_ids", []) if reverse else [instance.pk]
+    elif action in ("post_add", "post_remove"):
+        task_ids = pk_set if reverse else [instance.pk]
+    else:
+        return
+    if task_ids:
+        transaction.on_commit(partial(publish_tasks, "updated", list(task_ids)))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(publish_task_deleted, instance.pk, instance.project_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if not created or not get_broker().has_subscribers():
+        return
+    project_id = instance.get_project_id()
+    transaction.on_commit(partial(publish_comment, "created", instance, project_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    # Comments removed together with their task are covered by task.deleted.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is not Comment or not get_broker().has_subscribers():
+        return
+    project_id = instance.get_project_id()
+    transaction.on_commit(partial(publish_comment, "deleted", instance, project_id))
+
@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auth_app.models import User
+from comments.models import Comment
+from project.models import Project, ProjectUser
+from task.models import Task
+from .brokers import InMemoryBroker, RedisBroker
+
+
+class InMemoryBrokerTests(TestCase):
+    async def test_publish_reaches_each_subscriber_once(self):
+        broker = InMemoryBroker(queue_size=2)
+        subscription = broker.subscribe(["project:1", "task:1"])
+        other = broker.subscribe(["project:2"])
+
+        for number in range(3):
+            await sync_to_async(broker.publish)(["project:1", "task:1"], {"number": number})
+        await asyncio.sleep(0)
+
+        # The queue is bounded, the oldest event was dropped.
+        self.assertEqual([await subscription.get(), await subscription.get()], [{"number": 1}, {"number": 2}])
+        self.assertTrue(other.queue.empty())
+
+        subscription.close()
+        other.close()
+        self.assertFalse(broker.has_subscribers())
+
+
+class RedisBrokerTests(TestCase):
+    def broker(self):
+        # Nothing listens on port 1, so every Redis call fails right away.
+        return RedisBroker(queue_size=2, url='redis://127.0.0.1:1/0', channel='test:events')
+
+    async def test_received_events_reach_local_subscribers_once(self):
+        broker = self.broker()
+        # Subscribed without starting the Redis listener, messages are fed in directly.
+        subscription = InMemoryBroker.subscribe(broker, ["project:1", "task:1"])
+        broker.receive(json.dumps({"channels": ["project:1", "task:1"], "event": {"number": 1}}))
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(), {"number": 1})
+        self.assertTrue(subscription.queue.empty())
+        subscription.close()
+        self.assertFalse(broker._channels)
+
+    def test_publish_survives_redis_outage(self):
+        broker = self.broker()
+        with self.assertLogs('realtime.brokers', 'ERROR'):
+            broker.publish(["project:1"], {"at": now()})
+        self.assertFalse(broker.has_subscribers())
+
+
+class EventStreamViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(username='creator', password='password', email='creator@example.com')
+        cls.executor = User.objects.create_user(username='executor', password='password', email='executor@example.com')
+        cls.outsider = User.objects.create_user(username='outsider', password='password', email='outsider@example.com')
+        cls.project = Project.objects.create(name='Realtime Project')
+        cls.project.create_default_roles(cls.creator)
+        ProjectUser.objects.create(project=cls.project, user=cls.executor, role='executor')
+        cls.assigned_task = Task.objects.create(title='Assigned', project=cls.project, created_at=now(), updated_at=now())
+        cls.assigned_task.assigned_to.add(cls.executor)
+        cls.other_task = Task.objects.create(title='Other', project=cls.project, created_at=now(), updated_at=now())
+        cls.url = reverse('realtime_events')
+
+    def token(self, user):
+        return f'Bearer {AccessToken.for_user(user)}'
+
+    def update_task(self, task, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            task.title = title
+            task.save()
+
+    def add_comment(self, task):
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(task=task, user=self.creator, text='Realtime comment')
+
+    async def read_event(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), timeout=2)
+        name, data = chunk.decode().strip().split("\n")
+        return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    async def open_stream(self, user, **params):
+        response = await self.async_client.get(self.url, params, headers={'Authorization': self.token(user)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        return stream
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(self.url, {'project': self.project.id})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_denies_projects_the_user_cannot_see(self):
+        response = await self.async_client.get(
+            self.url, {'project': self.project.id}, headers={'Authorization': self.token(self.outsider)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = await self.async_client.get(self.url, headers={'Authorization': self.token(self.creator)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_streams_task_and_comment_events(self):
+        stream = await self.open_stream(self.creator, project=self.project.id)
+        try:
+            await sync_to_async(self.update_task)(self.other_task, 'Renamed')
+            name, event = await self.read_event(stream)
+            self.assertEqual(name, 'task.updated')
+            self.assertEqual(event['data']['title'], 'Renamed')
+
+            await sync_to_async(self.add_comment)(self.other_task)
+            name, event = await self.read_event(stream)
+            self.assertEqual(name, 'comment.created')
+            self.assertEqual(event['task'], self.other_task.id)
+        finally:
+            await stream.aclose()
+
+    async def test_executor_only_receives_assigned_tasks(self):
+        stream = await self.open_stream(self.executor, project=self.project.id)
+        try:
+            await sync_to_async(self.update_task)(self.other_task, 'Hidden')
+            await sync_to_async(self.add_comment)(self.other_task)
+            await sync_to_async(self.update_task)(self.assigned_task, 'Visible')
+
+            name, event = await self.read_event(stream)
+            self.assertEqual(name, 'task.updated')
+            self.assertEqual(event['task'], self.assigned_task.id)
+        finally:
+            await stream.aclose()
+
+    def remove_member(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectUser.objects.filter(project=self.project, user=user).get().delete()
+
+    async def test_removed_member_stops_receiving_events(self):
+        stream = await self.open_stream(self.executor, project=self.project.id)
+        try:
+            await sync_to_async(self.remove_member)(self.executor)
+            await sync_to_async(self.update_task)(self.assigned_task, 'After removal')
+            with self.assertRaises(StopAsyncIteration):
+                await asyncio.wait_for(anext(stream), timeout=2)
+        finally:
+            await stream.aclose()
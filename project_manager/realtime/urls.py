@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import EventStreamView
+
+urlpatterns = [
+    path('events/', EventStreamView.as_view(), name='realtime_events'),
+]
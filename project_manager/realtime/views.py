@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from auth_app.authentication import ClaimsJWTAuthentication
+from project.models import Project
+from project.roles import get_user_access
+from task.models import Task
+from .brokers import get_broker
+
+
+class EventFilter:
+    """
+    Access is checked again for every event through the role cache, so a
+    member removed from a project stops receiving its events. Executors only
+    see tasks they are assigned to: their events are matched against the
+    cached assignments and the assignees carried by task events.
+    """
+    def __init__(self, user, projects):
+        self.user_id = user.id
+        self.is_superuser = user.is_superuser
+        self.projects = projects
+        self.assigned_tasks = set()
+
+    def get_access(self):
+        if self.is_superuser:
+            return None
+        return get_user_access(self.user_id)
+
+    def revoked(self, access):
+        # Nothing subscribed to is visible any more.
+        return access is not None and not any(project_id in access["roles"] for project_id in self.projects)
+
+    def allows(self, event, access):
+        if access is None:
+            return True
+        role = access["roles"].get(event["project"])
+        if role in ("creator", "manager"):
+            return True
+        if role is None:
+            return False
+        task_id = event["task"]
+        if event["event"] in ("task.created", "task.updated"):
+            if self.user_id in event["data"]["assigned_to"]:
+                self.assigned_tasks.add(task_id)
+                return True
+            self.assigned_tasks.discard(task_id)
+            return False
+        if event["event"] == "task.deleted":
+            assigned = task_id in self.assigned_tasks or task_id in access["tasks"]
+            self.assigned_tasks.discard(task_id)
+            return assigned
+        return task_id in access["tasks"]
+
+
+def parse_ids(values):
+    ids = set()
+    for value in values:
+        for part in value.split(","):
+            if not part.strip().isdigit():
+                raise ValueError(part)
+            ids.add(int(part))
+    return ids
+
+
+def authenticate(request):
+    header = request.headers.get("Authorization", "")
+    # EventSource cannot send headers, so browsers pass the token in the query string.
+    raw_token = header[len("Bearer "):] if header.startswith("Bearer ") else request.GET.get("token")
+    if not raw_token:
+        return None
+    authentication = ClaimsJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def resolve_subscription(user, project_ids, task_ids):
+    projects = set(Project.objects.visible_to(user).filter(pk__in=project_ids).values_list("id", flat=True))
+    tasks = dict(Task.objects.visible_to(user).filter(pk__in=task_ids).values_list("id", "project_id"))
+    if len(projects) != len(project_ids) or len(tasks) != len(task_ids):
+        return None, None
+
+    channels = [f"project:{project_id}" for project_id in projects]
+    channels += [f"task:{task_id}" for task_id in tasks]
+    return channels, EventFilter(user, projects | set(tasks.values()))
+
+
+def format_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def stream_events(channels, event_filter):
+    subscription = get_broker().subscribe(channels)
+    try:
+        yield f"retry: {settings.REALTIME_RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=settings.REALTIME_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            access = await sync_to_async(event_filter.get_access)()
+            if event_filter.revoked(access):
+                break
+            if event_filter.allows(event, access):
+                yield format_event(event)
+    finally:
+        subscription.close()
+
+
+class EventStreamView(View):
+    async def get(self, request):
+        user = await sync_to_async(authenticate)(request)
+        if user is None or not user.is_active:
+            return JsonResponse({"error": "Authentication credentials were not provided or are invalid"}, status=401)
+
+        try:
+            project_ids = parse_ids(request.GET.getlist("project"))
+            task_ids = parse_ids(request.GET.getlist("task"))
+        except ValueError:
+            return JsonResponse({"error": "project and task must be IDs"}, status=400)
+        if not project_ids and not task_ids:
+            return JsonResponse({"error": "Subscribe to at least one project or task"}, status=400)
+
+        channels, event_filter = await sync_to_async(resolve_subscription)(user, project_ids, task_ids)
+        if channels is None:
+            return JsonResponse({"error": "Access denied"}, status=403)
+
+        response = StreamingHttpResponse(stream_events(channels, event_filter), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
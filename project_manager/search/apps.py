@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        from .indexes import restore_sqlite_triggers
+        # post_migrate is only sent for apps with models, which this one has
+        # none of, so listen to all of them; the check is cheap.
+        post_migrate.connect(restore_sqlite_triggers, dispatch_uid="search.restore_sqlite_triggers")
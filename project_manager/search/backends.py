@@ -0,0 +1,66 @@
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .indexes import SEARCH_CONFIG, comment_vector, task_vector
+
+MAX_TERMS = 10
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+class PostgresSearch:
+    """Matches against the GIN indexed tsvector expressions, ranked by ts_rank."""
+
+    def tasks(self, queryset, terms):
+        return self.apply(queryset, task_vector('"task_task".'), terms)
+
+    def comments(self, queryset, terms):
+        return self.apply(queryset, comment_vector('"comments_comment".'), terms)
+
+    def apply(self, queryset, vector, terms):
+        query = " & ".join(f"{term}:*" for term in terms)
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.filter(
+            RawSQL(f"({vector}) @@ {tsquery}", [query], output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL(f"ts_rank({vector}, {tsquery})", [query], output_field=FloatField())
+        )
+
+
+class SQLiteSearch:
+    """Matches against the FTS5 tables, ranked by bm25 with titles weighted up."""
+
+    def tasks(self, queryset, terms):
+        return self.apply(queryset, "task_task", "task_search", ", 4.0, 1.0", terms)
+
+    def comments(self, queryset, terms):
+        return self.apply(queryset, "comments_comment", "comment_search", "", terms)
+
+    def apply(self, queryset, table, fts, weights, terms):
+        # bm25() only works on the cursor doing the MATCH, so the FTS table
+        # has to be joined in; a correlated subquery re-runs the match per row.
+        query = " ".join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            tables=[fts],
+            where=[f'{fts}.rowid = "{table}"."id"', f"{fts} MATCH %s"],
+            params=[query],
+            select={"rank": f"-bm25({fts}{weights})"},
+        )
+
+
+BACKENDS = {
+    "postgresql": PostgresSearch,
+    "sqlite": SQLiteSearch,
+}
+
+
+def get_search_backend():
+    if connection.vendor not in BACKENDS:
+        raise ImproperlyConfigured(f"Full-text search is not available on {connection.vendor}")
+    return BACKENDS[connection.vendor]()
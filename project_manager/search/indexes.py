@@ -0,0 +1,100 @@
+from django.db import connections
+
+# Postgres: expression GIN indexes. The query side has to use the very same
+# expressions, so both are built from these helpers.
+SEARCH_CONFIG = "simple"
+
+
+def task_vector(prefix=""):
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}description, '')), 'B')"
+    )
+
+
+def comment_vector(prefix=""):
+    return f"to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}text, ''))"
+
+
+# Built CONCURRENTLY so writes to the tables are not blocked during the
+# build, which can't run inside a transaction. An interrupted concurrent
+# build leaves an invalid index behind, so drop it before building.
+POSTGRES_DROP = [
+    "DROP INDEX CONCURRENTLY IF EXISTS task_search_idx",
+    "DROP INDEX CONCURRENTLY IF EXISTS comment_search_idx",
+]
+POSTGRES_CREATE = POSTGRES_DROP + [
+    f"CREATE INDEX CONCURRENTLY task_search_idx ON task_task USING GIN (({task_vector()}))",
+    f"CREATE INDEX CONCURRENTLY comment_search_idx ON comments_comment USING GIN (({comment_vector()}))",
+]
+
+# SQLite: external content FTS5 tables kept in sync by triggers.
+SQLITE_TABLES = {
+    "task_search": ("task_task", ["title", "description"]),
+    "comment_search": ("comments_comment", ["text"]),
+}
+
+
+def sqlite_create_statements():
+    for fts, (table, columns) in SQLITE_TABLES.items():
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+        delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+        yield f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id')"
+        yield f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END"
+        yield f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END"
+        yield f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END"
+        yield f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+
+
+def sqlite_drop_statements():
+    for fts in SQLITE_TABLES:
+        for suffix in ("ai", "ad", "au"):
+            yield f"DROP TRIGGER IF EXISTS {fts}_{suffix}"
+        yield f"DROP TABLE IF EXISTS {fts}"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = POSTGRES_CREATE
+    elif vendor == "sqlite":
+        statements = sqlite_create_statements()
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = POSTGRES_DROP
+    elif vendor == "sqlite":
+        statements = sqlite_drop_statements()
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def restore_sqlite_triggers(using="default", **kwargs):
+    """
+    SQLite migrations that alter task_task or comments_comment rebuild the
+    table and silently drop its triggers. Put them back and reindex.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {name for _, name in cursor.fetchall()}
+        if not set(SQLITE_TABLES) <= existing:
+            return
+        triggers = {f"{fts}_{suffix}" for fts in SQLITE_TABLES for suffix in ("ai", "ad", "au")}
+        if triggers <= existing:
+            return
+        for statement in sqlite_create_statements():
+            cursor.execute(statement)
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from search.indexes import create_search_index, drop_search_index
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('task', '0004_task_project_status_idx'),
+        ('comments', '0002_comment_task_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
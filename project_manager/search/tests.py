@@ -0,0 +1,101 @@
+from unittest import skipUnless
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.db import connection
+from django.urls import reverse
+from auth_app.models import User
+from comments.models import Comment
+from project.models import Project, ProjectUser
+from task.models import Task
+from .backends import get_search_backend, search_terms
+
+
+class SearchViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='manager', password='password', email='manager@example.com')
+        self.project = Project.objects.create(name='Search Project')
+        self.project.create_default_roles(self.user)
+        self.hidden_project = Project.objects.create(name='Hidden Project')
+
+        self.title_hit = Task.objects.create(title='Database migration', description='Move data', project=self.project)
+        self.description_hit = Task.objects.create(title='Cleanup', description='Drop the old database dumps', project=self.project)
+        self.comment = Comment.objects.create(task=self.description_hit, user=self.user, text='Database dumps are 40GB')
+        Task.objects.create(title='Database secrets', description='Hidden', project=self.hidden_project)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('search')
+
+    def test_ranked_results_scoped_to_visible_projects(self):
+        response = self.client.get(self.url, {'q': 'databa'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual({(hit['type'], hit['id']) for hit in results},
+                         {('task', self.title_hit.id), ('task', self.description_hit.id), ('comment', self.comment.id)})
+        tasks = [hit['id'] for hit in results if hit['type'] == 'task']
+        self.assertEqual(tasks, [self.title_hit.id, self.description_hit.id])
+        self.assertEqual(results[-1 if results[-1]['type'] == 'comment' else 0]['project'], self.project.id)
+        # Ranks are scaled per source, the best task and the best comment both have rank 1.
+        self.assertEqual(sorted(hit['rank'] for hit in results)[-2:], [1.0, 1.0])
+
+        response = self.client.get(self.url, {'q': 'database dumps', 'type': 'comment'})
+        self.assertEqual([hit['id'] for hit in response.data['results']], [self.comment.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.title_hit.title = 'Schema rollout'
+        self.title_hit.save()
+        self.comment.delete()
+        response = self.client.get(self.url, {'q': 'database'})
+        self.assertEqual([(hit['type'], hit['id']) for hit in response.data['results']], [('task', self.description_hit.id)])
+        response = self.client.get(self.url, {'q': 'rollout'})
+        self.assertEqual([hit['id'] for hit in response.data['results']], [self.title_hit.id])
+
+    def test_pagination_and_validation(self):
+        response = self.client.get(self.url, {'q': 'database', 'limit': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+        self.assertEqual(self.client.get(self.url, {'q': '"*'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'user'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_executor_sees_assigned_tasks_only(self):
+        executor = User.objects.create_user(username='executor', password='password', email='executor@example.com')
+        ProjectUser.objects.create(user=executor, project=self.project, role='executor')
+        self.title_hit.assigned_to.add(executor)
+        self.client.force_authenticate(user=executor)
+        response = self.client.get(self.url, {'q': 'database'})
+        self.assertEqual([(hit['type'], hit['id']) for hit in response.data['results']], [('task', self.title_hit.id)])
+
+    def test_search_uses_text_index(self):
+        queryset = get_search_backend().tasks(Task.objects.all(), search_terms('database'))
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            self.assertIn('task_search_idx', queryset.explain())
+        else:
+            self.assertIn('VIRTUAL TABLE INDEX', queryset.explain())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'ts_rank and the GIN indexes are Postgres only')
+class PostgresSearchTests(APITestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Ranking Project')
+        self.title_hit = Task.objects.create(title='Invoice export', description='Monthly', project=self.project)
+        self.description_hit = Task.objects.create(title='Reports', description='Fix the invoice totals', project=self.project)
+        Task.objects.create(title='Unrelated', description='Nothing here', project=self.project)
+
+    def test_title_matches_rank_above_description_matches(self):
+        ranked = get_search_backend().tasks(Task.objects.all(), search_terms('invoi')).order_by('-rank')
+        hits = list(ranked.values_list('id', 'rank'))
+        self.assertEqual([task_id for task_id, _ in hits], [self.title_hit.id, self.description_hit.id])
+        self.assertGreater(hits[0][1], hits[1][1])
+
+    def test_indexes_built_concurrently_are_valid(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexrelid::regclass::text, indisvalid FROM pg_index "
+                "WHERE indexrelid::regclass::text IN ('task_search_idx', 'comment_search_idx')"
+            )
+            self.assertEqual(sorted(cursor.fetchall()), [('comment_search_idx', True), ('task_search_idx', True)])
@@ -0,0 +1,149 @@
+from django.conf import settings
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from task.models import Task
+from comments.models import Comment
+from .backends import get_search_backend, search_terms
+
+SEARCH_TYPES = ("task", "comment")
+
+
+def parse_window(request):
+    try:
+        limit = int(request.query_params.get("limit", settings.SEARCH_PAGE_SIZE))
+        offset = int(request.query_params.get("offset", 0))
+    except ValueError:
+        return None
+    if not 0 < limit <= settings.SEARCH_MAX_LIMIT or offset < 0 or offset + limit > settings.SEARCH_MAX_RESULTS:
+        return None
+    return limit, offset
+
+
+def normalize_ranks(hits):
+    """
+    Scales the ranks of one source so its best hit has rank 1. bm25 over
+    two FTS5 tables (or ts_rank over two vectors) gives scores that are not
+    on the same scale, so tasks and comments are merged by how close each
+    hit is to the best match of its own kind. The rows of every page start
+    from the top of the source, so the scale is the same on every page.
+    """
+    hits = list(hits)
+    best = hits[0]["rank"] if hits else 0
+    if best > 0:
+        for hit in hits:
+            hit["rank"] /= best
+    return hits
+
+
+class SearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Full-text search over task titles, descriptions and comments in the projects visible to the user",
+        manual_parameters=[
+            openapi.Parameter(
+                name="Authorization",
+                in_=openapi.IN_HEADER,
+                description="JWT token format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                name="q",
+                in_=openapi.IN_QUERY,
+                description="Search words, every word must match (as a prefix)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                name="type",
+                in_=openapi.IN_QUERY,
+                description="task or comment, both by default",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="limit",
+                in_=openapi.IN_QUERY,
+                description="Number of results per page",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="offset",
+                in_=openapi.IN_QUERY,
+                description="Number of results to skip",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Results ordered by rank",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'next': openapi.Schema(type=openapi.TYPE_STRING, description="URL of the next page"),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'type': openapi.Schema(type=openapi.TYPE_STRING, description="task or comment"),
+                                    'id': openapi.Schema(type=openapi.TYPE_INTEGER, description="Task or comment ID"),
+                                    'task': openapi.Schema(type=openapi.TYPE_INTEGER, description="Task ID"),
+                                    'project': openapi.Schema(type=openapi.TYPE_INTEGER, description="Project ID"),
+                                    'rank': openapi.Schema(type=openapi.TYPE_NUMBER, description="Relevance, higher is better"),
+                                },
+                            ),
+                        ),
+                    },
+                ),
+            ),
+            400: openapi.Response(description="Bad request"),
+        }
+    )
+    def get(self, request):
+        terms = search_terms(request.query_params.get("q", ""))
+        if not terms:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        search_type = request.query_params.get("type")
+        if search_type and search_type not in SEARCH_TYPES:
+            return Response({"error": f"type must be one of: {', '.join(SEARCH_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        window = parse_window(request)
+        if window is None:
+            return Response(
+                {"error": f"limit must be 1-{settings.SEARCH_MAX_LIMIT} and offset + limit at most {settings.SEARCH_MAX_RESULTS}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit, offset = window
+
+        # Each source only needs its own best offset + limit + 1 rows for the
+        # merged page to be right, the extra one tells whether there is more.
+        backend = get_search_backend()
+        size = offset + limit + 1
+        hits = []
+        if search_type in (None, "task"):
+            tasks = backend.tasks(Task.objects.visible_to(request.user), terms).order_by("-rank", "id")
+            hits.extend(normalize_ranks(
+                {"type": "task", "id": task["id"], "task": task["id"], "project": task["project_id"],
+                 "title": task["title"], "status": task["status"], "rank": task["rank"]}
+                for task in tasks.values("id", "project_id", "title", "status", "rank")[:size]
+            ))
+        if search_type in (None, "comment"):
+            comments = backend.comments(Comment.objects.visible_to(request.user), terms).order_by("-rank", "id")
+            hits.extend(normalize_ranks(
+                {"type": "comment", "id": comment["id"], "task": comment["task_id"], "project": comment["task__project_id"],
+                 "text": comment["text"], "rank": comment["rank"]}
+                for comment in comments.values("id", "task_id", "task__project_id", "text", "rank")[:size]
+            ))
+        hits.sort(key=lambda hit: (-hit["rank"], hit["type"], hit["id"]))
+
+        next_url = None
+        if len(hits) > offset + limit:
+            next_url = replace_query_param(request.build_absolute_uri(), "offset", offset + limit)
+        return Response({"next": next_url, "results": hits[offset:offset + limit]})
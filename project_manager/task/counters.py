@@ -0,0 +1,116 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+from django.utils.timezone import now
+
+from comments.models import Comment
+from project.models import Project
+from .models import Task
+
+def status_field(status):
+    return f"{status}_count"
+
+
+def update_task_counts(deltas, touch=True):
+    """
+    deltas maps (project id, status) to the change in the number of tasks.
+    The counts are part of the project representation, so updated_at is
+    bumped with them unless touch is off. The project row stays locked
+    until the transaction commits, so task writes within one project queue
+    up behind each other.
+    """
+    projects = defaultdict(Counter)
+    for (project_id, status), delta in deltas.items():
+        projects[project_id][status] += delta
+    for project_id, statuses in projects.items():
+        values = {status_field(status): F(status_field(status)) + delta for status, delta in statuses.items() if delta}
+        if not values:
+            continue
+        total = sum(statuses.values())
+        if total:
+            values["task_count"] = F("task_count") + total
+        if touch:
+            values["updated_at"] = now()
+        Project.objects.filter(pk=project_id).update(**values)
+
+
+def update_comment_counts(deltas, touch=True):
+    """
+    deltas maps task ids to the change in the number of comments, see
+    update_task_counts. A touched task moves up in lists ordered by
+    updated_at and matches updated_after filters again.
+    """
+    tasks = defaultdict(list)
+    for task_id, delta in deltas.items():
+        if delta:
+            tasks[delta].append(task_id)
+    for delta, task_ids in tasks.items():
+        values = {"comment_count": F("comment_count") + delta}
+        if touch:
+            values["updated_at"] = now()
+        Task.objects.filter(pk__in=task_ids).update(**values)
+
+
+def tasks_created(tasks):
+    update_task_counts(Counter((task.project_id, task.status) for task in tasks))
+
+
+def tasks_changed(tasks):
+    """
+    Moves tasks between counters when their status or project changed since
+    they were loaded. Callers load the tasks with select_for_update() in the
+    same transaction, otherwise two concurrent writes both move the task
+    out of the status they read.
+    """
+    deltas = Counter()
+    for task in tasks:
+        changes = task.get_changes()
+        if "status" not in changes and "project" not in changes:
+            continue
+        previous = {name: values[0] for name, values in changes.items()}
+        deltas[(previous.get("project", task.project_id), previous.get("status", task.status))] -= 1
+        deltas[(task.project_id, task.status)] += 1
+    update_task_counts(deltas)
+
+
+def recount_projects(project_ids):
+    """
+    Rewrites the task counters of the given projects that are off, returns
+    how many were. Runs in a transaction: the project rows are locked before
+    the tasks are counted, so task writes wait instead of being lost.
+    """
+    fields = ["task_count", *(status_field(status) for status, _ in Task.STATUS_CHOICES)]
+    projects = list(Project.objects.select_for_update().filter(id__in=project_ids).order_by("id").only("id", *fields))
+    actual = defaultdict(Counter)
+    groups = Task.objects.filter(project_id__in=project_ids).order_by().values_list("project_id", "status").annotate(total=Count("id"))
+    for project_id, status, total in groups:
+        actual[project_id][status] = total
+
+    stale = []
+    for project in projects:
+        counts = actual[project.id]
+        expected = {status_field(status): counts[status] for status, _ in Task.STATUS_CHOICES}
+        expected["task_count"] = sum(counts.values())
+        if any(getattr(project, name) != value for name, value in expected.items()):
+            for name, value in expected.items():
+                setattr(project, name, value)
+            project.updated_at = now()
+            stale.append(project)
+    Project.objects.bulk_update(stale, [*fields, "updated_at"])
+    return len(stale)
+
+
+def recount_tasks(task_ids):
+    """Rewrites the comment counters of the given tasks that are off, see recount_projects."""
+    tasks = list(Task.objects.select_for_update().filter(id__in=task_ids).order_by("id").only("id", "comment_count"))
+    actual = dict(
+        Comment.objects.filter(task_id__in=task_ids).order_by().values_list("task_id").annotate(total=Count("id"))
+    )
+    stale = []
+    for task in tasks:
+        if task.comment_count != actual.get(task.id, 0):
+            task.comment_count = actual.get(task.id, 0)
+            task.updated_at = now()
+            stale.append(task)
+    Task.objects.bulk_update(stale, ["comment_count", "updated_at"])
+    return len(stale)
@@ -0,0 +1,128 @@
+from datetime import datetime, time
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Task
+
+ORDERING_FIELDS = ('updated_at', 'created_at', 'due_date', 'title')
+DEFAULT_ORDERING = ('updated_at', 'id')
+
+
+def parse_moment(value):
+    """An ISO 8601 datetime, or a date meaning its midnight in the current time zone."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class TaskFilter:
+    """
+    Query parameters of the task list. Every filter is a plain column
+    condition or an EXISTS on the assignment table, so the whole list stays
+    one query that the (project, status, due_date) and (project, updated_at)
+    indexes can serve.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.errors = {}
+        self.conditions = {}
+        self.assignees = None
+        self.ordering = self.parse_ordering()
+
+        self.parse_list('project', 'project_id__in', int)
+        self.parse_list('status', 'status__in', self.parse_status)
+        self.parse_assignees()
+        for param, lookup in (
+            ('due_after', 'due_date__gte'),
+            ('due_before', 'due_date__lt'),
+            ('updated_after', 'updated_at__gte'),
+            ('updated_before', 'updated_at__lt'),
+        ):
+            self.parse_single(param, lookup, parse_moment)
+        self.overdue = self.parse_single('overdue', None, self.parse_bool)
+        if self.errors:
+            raise ValidationError(self.errors)
+
+    def values(self, param):
+        return [
+            part.strip()
+            for value in self.request.query_params.getlist(param)
+            for part in value.split(',') if part.strip()
+        ]
+
+    def parse_list(self, param, lookup, convert):
+        values = self.values(param)
+        if not values:
+            return
+        try:
+            self.conditions[lookup] = [convert(value) for value in values]
+        except ValueError:
+            self.errors[param] = f'Invalid value: {", ".join(values)}'
+
+    def parse_single(self, param, lookup, convert):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        try:
+            value = convert(value)
+        except ValueError:
+            self.errors[param] = f'Invalid value: {value}'
+            return None
+        if lookup:
+            self.conditions[lookup] = value
+        return value
+
+    def parse_status(self, value):
+        if value not in dict(Task.STATUS_CHOICES):
+            raise ValueError(value)
+        return value
+
+    def parse_bool(self, value):
+        if value.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(value)
+        return value.lower() in ('true', '1')
+
+    def parse_assignees(self):
+        values = self.values('assignee')
+        if not values:
+            return
+        try:
+            self.assignees = [self.request.user.id if value == 'me' else int(value) for value in values]
+        except ValueError:
+            self.errors['assignee'] = f'Expected user IDs or "me": {", ".join(values)}'
+
+    def parse_ordering(self):
+        keys = self.values('ordering')
+        if not keys:
+            return DEFAULT_ORDERING
+        unknown = [key for key in keys if key.lstrip('-') not in ORDERING_FIELDS]
+        if unknown or len({key.lstrip('-') for key in keys}) != len(keys):
+            self.errors['ordering'] = f'Use distinct keys from: {", ".join(ORDERING_FIELDS)}, prefixed with - for descending'
+            return DEFAULT_ORDERING
+        return (*keys, 'id')
+
+    def filter_queryset(self, queryset):
+        queryset = queryset.filter(**self.conditions)
+        if self.assignees is not None:
+            queryset = queryset.filter(Exists(
+                Task.assigned_to.through.objects.filter(task=OuterRef('pk'), user_id__in=self.assignees)
+            ))
+        if self.overdue is not None:
+            overdue = {'due_date__lt': timezone.now()}
+            if self.overdue:
+                queryset = queryset.filter(**overdue).exclude(status__in=Task.CLOSED_STATUSES)
+            else:
+                queryset = queryset.exclude(**overdue, status__in=[
+                    status for status, _ in Task.STATUS_CHOICES if status not in Task.CLOSED_STATUSES
+                ])
+        return queryset
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+STATUSES = ['new', 'in_progress', 'on_checking', 'completed', 'canceled']
+
+
+def count_subquery(queryset, owner):
+    return Coalesce(Subquery(
+        queryset.filter(**{owner: OuterRef('pk')}).order_by().values(owner).annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Project = apps.get_model('project', 'Project')
+    Task = apps.get_model('task', 'Task')
+    Comment = apps.get_model('comments', 'Comment')
+    Task.objects.update(comment_count=count_subquery(Comment.objects.all(), 'task'))
+    Project.objects.update(
+        task_count=count_subquery(Task.objects.all(), 'project'),
+        **{f'{status}_count': count_subquery(Task.objects.filter(status=status), 'project') for status in STATUSES},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0005_task_filter_indexes'),
+        ('project', '0005_task_counters'),
+        ('comments', '0002_comment_task_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,40 +1,130 @@
-from django.db import models
-from project.models import ProjectUser
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef
+from project.models import ProjectUser, membership_exists, access_annotation
+from project.roles import get_project_role, is_task_assignee
+from auth_app.models import User
+
+
+def assignment_exists(user, task_ref='pk'):
+    return Exists(
+        Task.assigned_to.through.objects.filter(task=OuterRef(task_ref), user_id=user.id)
+    )
+
+
+def task_visibility(user, task_ref='pk', project_ref='project'):
+    return (
+        membership_exists(user, project_ref, roles=["creator", "manager"])
+        | assignment_exists(user, task_ref)
+    )
+
+
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(task_visibility(user))
+
+    def manageable_by(self, user):
+        if user.is_superuser:
+            return self
+        return self.filter(membership_exists(user, 'project', roles=["creator", "manager"]))
+
+    def with_access(self, user):
+        return self.annotate(
+            can_view=access_annotation(user, task_visibility(user)),
+            can_manage=access_annotation(user, membership_exists(user, 'project', roles=["creator", "manager"])),
+        )
+
+    def with_assignees(self):
+        return self.prefetch_related(
+            models.Prefetch('assigned_to', queryset=User.objects.only('id'))
+        )
+
+    def delete(self):
+        # One counter update per project instead of one per deleted task.
+        from .counters import update_task_counts
+        groups = self.order_by().values_list('project_id', 'status').annotate(total=Count('id'))
+        with transaction.atomic(using=self.db, savepoint=False):
+            deltas = {(project_id, status): -total for project_id, status, total in groups}
+            deleted = super().delete()
+            update_task_counts(deltas)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Task(models.Model):
+    STATUS_CHOICES = [
+        ('new', 'New'),
+        ('in_progress', 'In Progress'), 
+        ('on_checking', 'On Checking'),
+        ('completed', 'Completed'), 
+        ('canceled', 'Canceled')]
+    CLOSED_STATUSES = ['completed', 'canceled']
+    # Compared with the values the task was loaded with, see get_changes().
+    TRACKED_FIELDS = {
+        'title': 'title',
+        'description': 'description',
+        'status': 'status',
+        'due_date': 'due_date',
+        'project': 'project_id',
+    }
+
     title = models.CharField(max_length=255)
     description = models.TextField()
     due_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    status = models.CharField(max_length=50, choices=[
-        ('new', 'New'),
-        ('in_progress', 'In Progress'), 
-        ('on_checking', 'On Checking'),
-        ('completed', 'Completed'), 
-        ('canceled', 'Canceled')], default='new')
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='new')
     project = models.ForeignKey('project.Project', on_delete=models.CASCADE, related_name='tasks')
     assigned_to = models.ManyToManyField('auth_app.User', related_name='tasks', blank=True)
+    # Kept current by task.counters, rebuilt by the recount command.
+    comment_count = models.IntegerField(default=0, editable=False)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='task_updated_at_id_idx'),
+            models.Index(fields=['project', 'status', 'due_date'], name='task_project_status_due_idx'),
+            models.Index(fields=['project', 'updated_at', 'id'], name='task_project_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        task._loaded_state = task.get_state()
+        return task
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_state = self.get_state()
+
+    def get_state(self):
+        # Reads __dict__ so deferred fields are skipped instead of loaded.
+        values = self.__dict__
+        return {name: values[attname] for name, attname in self.TRACKED_FIELDS.items() if attname in values}
+
+    def get_changes(self):
+        previous = getattr(self, '_loaded_state', {})
+        return {name: [previous[name], value] for name, value in self.get_state().items() if name in previous and previous[name] != value}
     
     def has_creator_access(self, user):
-        return self.project.projectuser_set.filter(user=user, project=self.project, role="creator").exists()
+        return get_project_role(user, self.project_id) == "creator"
 
     def has_manager_access(self, user):
-        return self.project.projectuser_set.filter(user=user, project=self.project, role="manager").exists()
+        return get_project_role(user, self.project_id) == "manager"
 
     def has_executor_access(self, user):
-        return self.assigned_to.filter(id=user.id).exists()
+        return is_task_assignee(user, self.id)
     
     def user_has_access(self, user):
-       
-        if self.has_creator_access(user):
-            return True  
-        if self.has_manager_access(user):
-            return True  
-        if self.has_executor_access(user):
-            return True  
-        return False
\ No newline at end of file
+        return (
+            self.has_creator_access(user)
+            or self.has_manager_access(user)
+            or self.has_executor_access(user)
+        )
\ No newline at end of file
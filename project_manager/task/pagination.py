@@ -0,0 +1,8 @@
+from django.conf import settings
+from project_manager.pagination import KeysetPagination
+
+
+class TaskPagination(KeysetPagination):
+    ordering = ('updated_at', 'id')
+    nullable = ('due_date',)
+    page_size = settings.TASK_PAGE_SIZE
@@ -1,7 +1,24 @@
 from rest_framework import serializers
+from project_manager.fieldsets import SparseFieldsMixin
+from project_manager.serializers import ValuesSerializer
 from .models import Task
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class TaskValuesSerializer(ValuesSerializer):
+    serializer_class = TaskSerializer
+
+
+class TaskBatchItemSerializer(serializers.ModelSerializer):
+    # Relations are validated in bulk by the batch view instead of one
+    # lookup per item.
+    project = serializers.IntegerField()
+    assigned_to = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Task
+        fields = ('title', 'description', 'due_date', 'status', 'project', 'assigned_to')
@@ -0,0 +1,47 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from project.roles import invalidate_user_access
+from .counters import tasks_changed, tasks_created, update_task_counts
+from .models import Task
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        tasks_created([instance])
+    else:
+        tasks_changed([instance])
+
+
+@receiver(post_delete, sender=Task)
+def count_deleted_task(sender, instance, origin=None, **kwargs):
+    # Queryset deletes are counted by TaskQuerySet.delete, and there is
+    # nothing to count when the project itself goes away.
+    if isinstance(origin, Task):
+        update_task_counts({(instance.project_id, instance.status): -1})
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def assignments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        related = instance.tasks if reverse else instance.assigned_to
+        instance._cleared_assignment_ids = list(related.values_list("id", flat=True))
+        return
+    if action == "post_clear":
+        pk_set = getattr(instance, "_cleared_assignment_ids", [])
+    elif action not in ("post_add", "post_remove"):
+        return
+
+    if reverse:
+        user_ids, task_ids = [instance.pk], pk_set
+    else:
+        user_ids, task_ids = pk_set, [instance.pk]
+    invalidate_user_access(*user_ids)
+    # Assignees are part of the task representation, so conditional GETs
+    # must see a new updated_at.
+    if task_ids:
+        Task.objects.filter(pk__in=task_ids).update(updated_at=now())
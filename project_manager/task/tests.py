@@ -1,12 +1,25 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 from django.test import TestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from django.utils.timezone import now
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Task
+from .serializers import TaskSerializer, TaskValuesSerializer
+from project_manager.renderers import FastJSONRenderer
 from auth_app.models import User
-from project.models import Project
+from project.models import Project, ProjectUser
+from comments.models import Comment
+from project.seed import populate_project
+from project.testing import QueryBudgetMixin
 
 class TaskViewTests(APITestCase):
     def setUp(self):
@@ -47,4 +60,378 @@ class TaskViewTests(APITestCase):
     def test_access_denied_for_unauthorized_user(self):
         self.auth_header_user = {'Authorization': f'Bearer '}
         response = self.client.get(self.task_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)            
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_reads_match_sync(self):
+        header = self.auth_header_user['Authorization']
+        async_url = reverse('task_detail_async', kwargs={'task_id': self.task.id})
+        expected = self.client.get(self.task_url, HTTP_AUTHORIZATION=header)
+        response = self.client.get(async_url, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+        response = self.client.get(async_url, HTTP_AUTHORIZATION=header, HTTP_IF_NONE_MATCH=expected['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        expected = self.client.get(self.task_list_url, HTTP_AUTHORIZATION=header)
+        response = self.client.get(reverse('tasks_async'), HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+
+        response = self.client.get(reverse('tasks_async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sparse_fieldsets(self):
+        header = self.auth_header_user['Authorization']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.task_list_url, {'fields': 'id,title,status,due_date'}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'status', 'due_date'})
+        self.assertFalse([
+            query for query in context
+            if '"description"' in query['sql'] or 'JOIN "task_task_assigned_to"' in query['sql']
+        ])
+
+        response = self.client.get(self.task_url, {'exclude': 'description,assigned_to'}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', response.data)
+        self.assertEqual(response.data['title'], 'Test Task')
+        full = self.client.get(self.task_url, HTTP_AUTHORIZATION=header)
+        self.assertNotEqual(response['ETag'], full['ETag'])
+
+        response = self.client.get(reverse('tasks_async'), {'fields': 'id,assigned_to'}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.json()['results'], [{'id': self.task.id, 'assigned_to': [self.user.id]}])
+
+        response = self.client.get(self.task_list_url, {'fields': 'id,secret'}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', response.data['fields'])
+
+    def test_list_tasks_paginated_by_cursor(self):
+        for i in range(4):
+            Task.objects.create(title=f'Task {i}', project=self.project)
+
+        seen = []
+        url = f'{self.task_list_url}?page_size=2'
+        while url:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(sorted(seen), sorted(Task.objects.values_list('id', flat=True)))
+
+    def test_list_tasks_invalid_cursor(self):
+        response = self.client.get(f'{self.task_list_url}?cursor=not-a-cursor', HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_tasks_query_count_does_not_grow_with_rows(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.task_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context)
+
+        baseline = list_queries()
+        for i in range(20):
+            task = Task.objects.create(title=f'Task {i}', project=self.project)
+            task.assigned_to.add(self.user)
+
+        self.assertEqual(list_queries(), baseline)
+        with self.assertNumQueries(4):
+            self.client.get(self.task_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+
+    def test_unassigned_executor_cannot_see_task(self):
+        executor = User.objects.create_user(username='executor', password='password', email='executor@example.com')
+        ProjectUser.objects.create(user=executor, project=self.project, role='executor')
+        header = f'Bearer {str(RefreshToken.for_user(executor).access_token)}'
+
+        response = self.client.get(self.task_url, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(self.task_list_url, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.data['results'], [])
+
+        self.task.assigned_to.add(executor)
+        response = self.client.get(self.task_url, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(self.task_url, {"title": "Nope"}, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.task_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+        etag = response['ETag']
+
+        response = self.client.get(self.task_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.task_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+        list_etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.task_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        other = User.objects.create_user(username='other', password='password', email='other@example.com')
+        self.task.assigned_to.add(other)
+        response = self.client.get(self.task_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.task_list_url, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Task.objects.create(title='Second', description='Next page', project=self.project)
+        response = self.client.get(self.task_list_url, {'page_size': 1}, HTTP_AUTHORIZATION=self.auth_header_user['Authorization'])
+        response = self.client.get(response.data['next'], HTTP_AUTHORIZATION=self.auth_header_user['Authorization'], HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+
+class TaskFilterTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='manager', password='password', email='manager@example.com')
+        self.other = User.objects.create_user(username='other', password='password', email='other@example.com')
+        self.project = Project.objects.create(name='Filter Project')
+        self.project.create_default_roles(self.user)
+        self.other_project = Project.objects.create(name='Other Project')
+        self.other_project.create_default_roles(self.user)
+        current = now()
+        self.mine = Task.objects.create(title='Mine', project=self.project, status='in_progress', due_date=current + timedelta(days=2))
+        self.mine.assigned_to.add(self.user)
+        self.late = Task.objects.create(title='Late', project=self.project, status='new', due_date=current - timedelta(days=1))
+        self.late.assigned_to.add(self.other)
+        self.done = Task.objects.create(title='Done', project=self.project, status='completed', due_date=current - timedelta(days=3))
+        self.undated = Task.objects.create(title='Undated', project=self.other_project, status='in_progress')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('tasks')
+
+    def ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [task['id'] for task in response.data['results']]
+
+    def test_filters(self):
+        week = (now() + timedelta(days=7)).date().isoformat()
+        self.assertEqual(self.ids({'project': self.project.id, 'status': 'in_progress', 'assignee': 'me', 'due_before': week}), [self.mine.id])
+        self.assertEqual(set(self.ids({'status': ['new', 'completed']})), {self.late.id, self.done.id})
+        self.assertEqual(self.ids({'status': 'new,completed', 'assignee': self.other.id}), [self.late.id])
+        self.assertEqual(self.ids({'overdue': 'true'}), [self.late.id])
+        self.assertEqual(set(self.ids({'overdue': 'false'})), {self.mine.id, self.done.id, self.undated.id})
+        self.assertEqual(self.ids({'updated_after': (now() + timedelta(minutes=1)).isoformat()}), [])
+        self.assertEqual(set(self.ids({'due_after': self.late.due_date.isoformat()})), {self.mine.id, self.late.id})
+
+        response = self.client.get(reverse('tasks_async'), {'project': self.project.id, 'assignee': 'me'})
+        self.assertEqual([task['id'] for task in response.json()['results']], [self.mine.id])
+
+    def test_invalid_filters(self):
+        response = self.client.get(self.url, {'status': 'bogus', 'assignee': 'you', 'due_before': 'soon', 'ordering': 'description'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'status', 'assignee', 'due_before', 'ordering'})
+
+    def test_ordering_pages_through_nullable_keys(self):
+        for ordering, expected in (
+            ('due_date', [self.done, self.late, self.mine, self.undated]),
+            ('-due_date', [self.mine, self.late, self.done, self.undated]),
+            ('title', [self.done, self.late, self.mine, self.undated]),
+        ):
+            seen = []
+            url = f'{self.url}?ordering={ordering}&page_size=1'
+            while url:
+                response = self.client.get(url)
+                seen.extend(task['id'] for task in response.data['results'])
+                url = response.data['next']
+            self.assertEqual(seen, [task.id for task in expected], ordering)
+
+    def test_filtered_list_uses_composite_indexes(self):
+        queryset = Task.objects.filter(project_id=self.project.id, status__in=['new', 'in_progress'], due_date__lt=now())
+        self.assertUsesIndex(queryset, ['project_id', 'status', 'due_date'])
+        queryset = Task.objects.filter(project_id=self.project.id).order_by('updated_at', 'id')
+        self.assertUsesIndex(queryset, ['project_id', 'updated_at', 'id'])
+
+
+class TaskRenderingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='manager', password='password', email='manager@example.com')
+        self.other = User.objects.create_user(username='other', password='password', email='other@example.com')
+        self.project = Project.objects.create(name='Render Project')
+        self.project.create_default_roles(self.user)
+        self.tasks = [
+            Task.objects.create(title='Plain', description='No dates', project=self.project),
+            Task.objects.create(title='Dated \u2028', description='Due', due_date=now(), project=self.project),
+        ]
+        self.tasks[1].assigned_to.add(self.other, self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_values_serializer_matches_model_serializer(self):
+        queryset = Task.objects.filter(project=self.project).order_by('id')
+        renderer = JSONRenderer()
+        for fields in (None, [], ['id', 'due_date', 'assigned_to']):
+            serializer = TaskValuesSerializer(fields=fields)
+            rows = serializer.to_representation(serializer.values(queryset))
+            expected = renderer.render(TaskSerializer(queryset.with_assignees(), many=True, fields=fields).data)
+            self.assertEqual(json.loads(FastJSONRenderer().render(rows)), json.loads(expected))
+            with patch('project_manager.renderers.orjson', None):
+                self.assertEqual(FastJSONRenderer().render(rows), expected)
+
+    def test_fast_parser(self):
+        response = self.client.post(reverse('tasks'), '{"title": "Parsed", "description": "d", "project": %d}' % self.project.id,
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('tasks'), '{"title": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskBatchViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='manager', password='password', email='manager@example.com')
+        self.project = Project.objects.create(name='Batch Project')
+        self.project.create_default_roles(self.user)
+        self.other_project = Project.objects.create(name='Other Project')
+        self.tasks = [Task.objects.create(title=f'Task {i}', project=self.project) for i in range(3)]
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('task_batch')
+
+    def test_batch_create_update_delete(self):
+        data = {
+            "create": [
+                {"title": "New 1", "description": "d", "project": self.project.id, "assigned_to": [self.user.id]},
+                {"title": "New 2", "description": "d", "project": self.project.id},
+            ],
+            "update": [{"id": self.tasks[0].id, "status": "completed", "assigned_to": [self.user.id]}],
+            "delete": [self.tasks[1].id],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task['title'] for task in response.data['create']], ["New 1", "New 2"])
+        self.assertEqual(response.data['create'][0]['assigned_to'], [self.user.id])
+        self.assertEqual(response.data['update'][0]['status'], "completed")
+        self.assertFalse(Task.objects.filter(id=self.tasks[1].id).exists())
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(list(self.tasks[0].assigned_to.values_list('id', flat=True)), [self.user.id])
+        self.assertTrue(self.tasks[0].has_executor_access(self.user))
+
+    def test_batch_is_all_or_nothing(self):
+        data = {
+            "create": [{"title": "New", "description": "d", "project": self.project.id}],
+            "update": [{"id": self.tasks[0].id, "status": "bogus"}],
+            "delete": [self.tasks[1].id, 999999],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['update'][0]['index'], 0)
+        self.assertEqual(response.data['delete'][0]['index'], 1)
+        self.assertEqual(Task.objects.count(), 3)
+
+        for payload in ([self.tasks[0].id], {"delete": self.tasks[0].id}, {"update": {"id": self.tasks[0].id}}):
+            with self.subTest(payload=payload):
+                response = self.client.post(self.url, payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_batch_access_denied_for_foreign_project(self):
+        data = {"create": [{"title": "New", "description": "d", "project": self.other_project.id}]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Task.objects.filter(project=self.other_project).exists())
+
+
+class TaskCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='manager', password='password', email='manager@example.com')
+        self.project = Project.objects.create(name='Counted Project')
+        self.project.create_default_roles(self.user)
+        self.other_project = Project.objects.create(name='Other Project')
+        self.tasks = [Task.objects.create(title=f'Task {i}', project=self.project) for i in range(3)]
+        self.client.force_authenticate(user=self.user)
+
+    def counts(self, project):
+        project.refresh_from_db()
+        return project.task_count, {status: getattr(project, f'{status}_count') for status, _ in Task.STATUS_CHOICES if getattr(project, f'{status}_count')}
+
+    def test_task_writes_keep_project_counts(self):
+        self.assertEqual(self.counts(self.project), (3, {'new': 3}))
+
+        task = Task.objects.get(id=self.tasks[0].id)
+        task.status = 'completed'
+        task.save()
+        moved = Task.objects.get(id=self.tasks[1].id)
+        moved.project = self.other_project
+        moved.status = 'in_progress'
+        moved.save()
+        self.assertEqual(self.counts(self.project), (2, {'new': 1, 'completed': 1}))
+        self.assertEqual(self.counts(self.other_project), (1, {'in_progress': 1}))
+
+        task.delete()
+        Task.objects.filter(project=self.other_project).delete()
+        self.assertEqual(self.counts(self.project), (1, {'new': 1}))
+        self.assertEqual(self.counts(self.other_project), (0, {}))
+
+        response = self.client.post(reverse('task_batch'), {
+            'create': [{'title': 'New', 'description': 'd', 'project': self.project.id, 'status': 'on_checking'}],
+            'update': [{'id': self.tasks[2].id, 'status': 'canceled'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(self.project), (2, {'on_checking': 1, 'canceled': 1}))
+
+    def test_comment_writes_keep_task_counts(self):
+        task = self.tasks[0]
+        before = Task.objects.get(id=task.id).updated_at
+        comments = [Comment.objects.create(task=task, user=self.user, text=f'Comment {i}') for i in range(3)]
+        comments[0].delete()
+        task.refresh_from_db()
+        self.assertEqual(task.comment_count, 2)
+        self.assertGreater(task.updated_at, before)
+
+        response = self.client.get(reverse('tasks'), {'project': self.project.id, 'fields': 'id,comment_count'})
+        self.assertEqual({row['id']: row['comment_count'] for row in response.data['results']}[task.id], 2)
+        response = self.client.patch(f'/api/task/{task.id}/', {'comment_count': 10}, format='json')
+        self.assertEqual(response.data['comment_count'], 2)
+
+        # Comments removed with their author still count down.
+        author = User.objects.create_user(username='author', password='password', email='author@example.com')
+        Comment.objects.create(task=task, user=author, text='Bye')
+        author.delete()
+        task.refresh_from_db()
+        self.assertEqual(task.comment_count, 2)
+
+    def test_recount_fixes_drift(self):
+        Comment.objects.create(task=self.tasks[0], user=self.user, text='Counted')
+        Project.objects.filter(id=self.project.id).update(task_count=0, new_count=7)
+        Task.objects.filter(id=self.tasks[0].id).update(comment_count=5)
+        Task.objects.filter(id=self.tasks[1].id).update(comment_count=-1)
+
+        out = StringIO()
+        call_command('recount', batch_size=2, stdout=out)
+        self.assertIn('projects fixed: 1', out.getvalue())
+        self.assertIn('tasks fixed: 2', out.getvalue())
+        self.assertEqual(self.counts(self.project), (3, {'new': 3}))
+        self.assertEqual(
+            dict(Task.objects.filter(project=self.project).values_list('id', 'comment_count')),
+            {self.tasks[0].id: 1, self.tasks[1].id: 0, self.tasks[2].id: 0},
+        )
+
+
+class TaskQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='budget', password='password', email='budget@example.com')
+        self.project = Project.objects.create(name='Budget Project')
+        self.project.create_default_roles(self.user)
+        self.task = Task.objects.create(title='Budget Task', project=self.project)
+        self.client.force_authenticate(user=self.user)
+
+    def test_task_list_query_count(self):
+        grow = lambda size: populate_project(self.project, [self.user.id], tasks=size, comments=1, assignees=1)
+        self.assertQueryCountConstant(reverse('tasks'), grow)
+        self.assertQueryCountConstant(reverse('tasks_async'), grow)
+
+    def test_task_detail_query_count(self):
+        def grow(size):
+            offset = User.objects.count()
+            users = User.objects.bulk_create([
+                User(username=f'assignee{offset + i}', email=f'assignee{offset + i}@example.com') for i in range(size)
+            ])
+            self.task.assigned_to.add(*users)
+
+        self.assertQueryCountConstant(reverse('task_detail', kwargs={'task_id': self.task.id}), grow)
+        self.assertQueryCountConstant(reverse('task_time', kwargs={'task_id': self.task.id}), grow)
+
+    def test_project_status_lookup_uses_index(self):
+        queryset = Task.objects.filter(project_id=self.project.id, status='in_progress')
+        self.assertUsesIndex(queryset, ['project_id', 'status'])
@@ -1,8 +1,11 @@
 from django.urls import path, include
-from .views import TaskView, TaskTimeAPIView
+from .views import TaskView, TaskTimeAPIView, TaskBatchView, TaskAsyncView
 
 urlpatterns = [
     path('', TaskView.as_view(), name='tasks'),
+    path('batch/', TaskBatchView.as_view(), name='task_batch'),
+    path('async/', TaskAsyncView.as_view(), name='tasks_async'),
+    path('async/<int:task_id>/', TaskAsyncView.as_view(), name='task_detail_async'),
     path('<int:task_id>/', TaskView.as_view(), name='task_detail'),
     path('time/<int:task_id>/', TaskTimeAPIView.as_view(), name='task_time'),
     path('<int:task_id>/comments/', include('comments.urls'), name='comment_task'),
@@ -1,12 +1,25 @@
+from collections import defaultdict
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from .models import Task
-from .serializers import TaskSerializer
+from .serializers import TaskSerializer, TaskBatchItemSerializer, TaskValuesSerializer
+from .pagination import TaskPagination
+from .filters import TaskFilter
+from .counters import tasks_changed, tasks_created
+from project_manager.async_views import AsyncAPIView
+from project_manager.fieldsets import DETAIL_COLUMNS, requested_fields, only_fields
+from project_manager.conditional import make_etag, list_etag, alist_etag, not_modified, with_validators
 from project.models import Project, ProjectUser
-from django.shortcuts import get_object_or_404
+from project.roles import has_project_role, invalidate_user_access
+from realtime.events import publish_task_data
+from activity.recorder import assignments_changed, task_changed, task_created
+from auth_app.models import User
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404, aget_object_or_404
 from django.utils.timezone import now
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -77,6 +90,84 @@ class TaskView(APIView):
                 type=openapi.TYPE_INTEGER,
                 required=True
             ),
+            openapi.Parameter(
+                name="cursor",
+                in_=openapi.IN_QUERY,
+                description="Opaque cursor taken from the `next` link of the previous page",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="page_size",
+                in_=openapi.IN_QUERY,
+                description="Number of tasks per page",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                name="project",
+                in_=openapi.IN_QUERY,
+                description="Project IDs, comma-separated or repeated",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="status",
+                in_=openapi.IN_QUERY,
+                description="Statuses, comma-separated or repeated",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="assignee",
+                in_=openapi.IN_QUERY,
+                description='Assignee user IDs or "me"',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="due_after",
+                in_=openapi.IN_QUERY,
+                description="Due on or after this ISO 8601 date or datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="due_before",
+                in_=openapi.IN_QUERY,
+                description="Due before this ISO 8601 date or datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="overdue",
+                in_=openapi.IN_QUERY,
+                description="true for open tasks past their due date",
+                type=openapi.TYPE_BOOLEAN,
+            ),
+            openapi.Parameter(
+                name="updated_after",
+                in_=openapi.IN_QUERY,
+                description="Updated on or after this ISO 8601 date or datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="updated_before",
+                in_=openapi.IN_QUERY,
+                description="Updated before this ISO 8601 date or datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="ordering",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated keys from updated_at, created_at, due_date, title; prefix with - for descending",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="fields",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. id,title,status",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                name="exclude",
+                in_=openapi.IN_QUERY,
+                description="Comma-separated fields to leave out",
+                type=openapi.TYPE_STRING,
+            ),
         ],
         responses={
             200: TaskSerializer(many=True),
@@ -92,20 +183,30 @@ class TaskView(APIView):
         }
     )
     def get(self, request, task_id=None):
+        selected = requested_fields(request, TaskSerializer)
         if task_id:
-            task = get_object_or_404(Task, id=task_id)
-            if task.user_has_access(request.user) or request.user.is_superuser:
-                return Response(TaskSerializer(task).data)
-            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+            task = get_object_or_404(only_fields(Task.objects.with_access(request.user), selected, DETAIL_COLUMNS), id=task_id)
+            if not task.can_view:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = make_etag("task", task.id, task.updated_at.isoformat(), *(selected or ()))
+            cached = not_modified(request, etag, task.updated_at)
+            if cached is not None:
+                return cached
+            return with_validators(Response(TaskSerializer(task, fields=selected).data), etag, task.updated_at)
         
-        if request.user.is_superuser:
-            tasks = Task.objects.all()
-            serializer = TaskSerializer(tasks, many=True)
-            return Response(serializer.data)   
-         
-        tasks = Task.objects.filter(project__staff=request.user)
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data)    
+        task_filter = TaskFilter(request)
+        tasks = task_filter.filter_queryset(Task.objects.visible_to(request.user))
+        etag = list_etag(request, tasks)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        paginator = TaskPagination()
+        paginator.ordering = task_filter.ordering
+        serializer = TaskValuesSerializer(fields=selected)
+        page = paginator.paginate_queryset(serializer.values(tasks, paginator.fields), request, view=self)
+        return with_validators(paginator.get_paginated_response(serializer.to_representation(page)), etag)
     
     @swagger_auto_schema(
         operation_description="Delete a task",
@@ -139,12 +240,14 @@ class TaskView(APIView):
         }
     )
     def delete(self, request, task_id):
-        task = get_object_or_404(Task, id=task_id)
+        # The row is locked so the counters see the status it is deleted with.
+        with transaction.atomic():
+            task = get_object_or_404(Task.objects.select_for_update(), id=task_id)
+
+            if task.has_creator_access(request.user) or task.has_manager_access(request.user) or request.user.is_superuser:
+                task.delete()
+                return Response(status=status.HTTP_204_NO_CONTENT)
 
-        if task.has_creator_access(request.user) or task.has_manager_access(request.user) or request.user.is_superuser:
-            task.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
     
     @swagger_auto_schema(
@@ -189,14 +292,17 @@ class TaskView(APIView):
         }
     )
     def patch(self, request, task_id):
-        task = get_object_or_404(Task, id=task_id)
+        # Counters move the task from the status it was loaded with, so no
+        # other write may change it before this one commits.
+        with transaction.atomic():
+            task = get_object_or_404(Task.objects.select_for_update(), id=task_id)
 
-        if task.has_creator_access(request.user) or task.has_manager_access(request.user) or request.user.is_superuser:
-            serializer = TaskSerializer(task, data=request.data, partial=True)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            if task.has_creator_access(request.user) or task.has_manager_access(request.user) or request.user.is_superuser:
+                serializer = TaskSerializer(task, data=request.data, partial=True)
+                if serializer.is_valid():
+                    serializer.save()
+                    return Response(serializer.data)
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
 
@@ -205,9 +311,9 @@ class TaskTimeAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, task_id):
-        task = get_object_or_404(Task, id=task_id)
+        task = get_object_or_404(Task.objects.with_access(request.user), id=task_id)
 
-        if not (task.user_has_access(request.user) or request.user.is_superuser):
+        if not task.can_view:
             return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
         return Response(self.get_task_time_info(task))
             
@@ -219,4 +325,228 @@ class TaskTimeAPIView(APIView):
             'time_since_creation': (now() - task.created_at).total_seconds(),
             'time_since_update': (now() - task.updated_at).total_seconds(),
             'time_remaining': (task.due_date - now()).total_seconds() if task.due_date else None,
-        }        
\ No newline at end of file
+        }        
+
+
+class TaskBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Create, update and delete many tasks in one transaction",
+        manual_parameters=[
+            openapi.Parameter(
+                name="Authorization",
+                in_=openapi.IN_HEADER,
+                description="JWT token format: Bearer <token>",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'create': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT), description="Tasks to create"),
+                'update': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT), description="Partial updates, each with an `id`"),
+                'delete': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER), description="IDs of tasks to delete"),
+            },
+        ),
+        responses={
+            200: openapi.Response(description="Created and updated tasks, deleted task IDs"),
+            400: openapi.Response(description="Per-item errors, nothing was applied"),
+            403: openapi.Response(description="Access denied for some items, nothing was applied"),
+        }
+    )
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object with create, update and delete lists"}, status=status.HTTP_400_BAD_REQUEST)
+        operations = {key: request.data.get(key, None) or [] for key in ("create", "update", "delete")}
+        if not all(isinstance(items, list) for items in operations.values()):
+            return Response({"error": "create, update and delete must be lists"}, status=status.HTTP_400_BAD_REQUEST)
+        if sum(len(items) for items in operations.values()) > settings.TASK_BATCH_MAX_SIZE:
+            return Response({"error": f"At most {settings.TASK_BATCH_MAX_SIZE} operations per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = {"create": {}, "update": {}, "delete": {}}
+        creates = self.validate_items(operations["create"], errors["create"])
+        updates = self.validate_items(operations["update"], errors["update"], partial=True)
+
+        targets = {}
+        seen = set()
+        for kind, items in (("update", operations["update"]), ("delete", operations["delete"])):
+            for index, item in enumerate(items):
+                task_id = item.get("id") if kind == "update" and isinstance(item, dict) else item
+                if not isinstance(task_id, int) or isinstance(task_id, bool):
+                    errors[kind].setdefault(index, {"id": ["A valid task ID is required."]})
+                elif task_id in seen:
+                    errors[kind].setdefault(index, {"id": ["Task appears more than once in the batch."]})
+                else:
+                    seen.add(task_id)
+                    targets[(kind, index)] = task_id
+
+        with transaction.atomic():
+            # The targets stay locked until the batch is written, so concurrent
+            # batches and PATCHes cannot overwrite each other's changes.
+            tasks = Task.objects.select_for_update().order_by("pk").in_bulk(targets.values())
+            for (kind, index), task_id in targets.items():
+                if task_id not in tasks:
+                    errors[kind].setdefault(index, {"id": ["Not found."]})
+
+            self.validate_relations(creates, errors["create"])
+            self.validate_relations(updates, errors["update"])
+
+            allowed = {}
+
+            def can_manage(project_id):
+                if project_id not in allowed:
+                    allowed[project_id] = request.user.is_superuser or has_project_role(request.user, project_id, ("creator", "manager"))
+                return allowed[project_id]
+
+            for index, data in creates.items():
+                if not can_manage(data["project"]):
+                    errors["create"].setdefault(index, {"error": "Access denied"})
+            for (kind, index), task_id in targets.items():
+                task = tasks.get(task_id)
+                if task is None:
+                    continue
+                new_project = updates.get(index, {}).get("project") if kind == "update" else None
+                if not can_manage(task.project_id) or (new_project and not can_manage(new_project)):
+                    errors[kind].setdefault(index, {"error": "Access denied"})
+
+            if any(errors.values()):
+                denied = all(error == {"error": "Access denied"} for kind_errors in errors.values() for error in kind_errors.values())
+                return Response(
+                    {kind: [{"index": index, "errors": error} for index, error in sorted(kind_errors.items())] for kind, kind_errors in errors.items()},
+                    status=status.HTTP_403_FORBIDDEN if denied else status.HTTP_400_BAD_REQUEST,
+                )
+
+            update_targets = {index: tasks[targets[("update", index)]] for index in updates}
+            delete_ids = [targets[("delete", index)] for index in range(len(operations["delete"]))]
+            created = self.create_tasks(creates)
+            updated = self.update_tasks(update_targets, updates)
+            if delete_ids:
+                Task.objects.filter(id__in=delete_ids).delete()
+
+        saved = Task.objects.with_assignees().in_bulk([task.id for task in created + updated])
+        created_data = TaskSerializer([saved[task.id] for task in created], many=True).data
+        updated_data = TaskSerializer([saved[task.id] for task in updated], many=True).data
+        # Bulk writes do not send model signals, so push the changes here.
+        publish_task_data("created", created_data)
+        publish_task_data("updated", updated_data)
+        return Response({
+            "create": created_data,
+            "update": updated_data,
+            "delete": delete_ids,
+        })
+
+    def validate_items(self, items, errors, partial=False):
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = TaskBatchItemSerializer(data=item, partial=partial)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        return valid
+
+    def validate_relations(self, items, errors):
+        project_ids = {data["project"] for data in items.values() if "project" in data}
+        user_ids = {user_id for data in items.values() for user_id in data.get("assigned_to", [])}
+        projects = set(Project.objects.filter(id__in=project_ids).values_list("id", flat=True)) if project_ids else set()
+        users = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True)) if user_ids else set()
+
+        for index, data in items.items():
+            if "project" in data and data["project"] not in projects:
+                errors.setdefault(index, {"project": [f'Invalid pk "{data["project"]}" - object does not exist.']})
+            missing = [user_id for user_id in data.get("assigned_to", []) if user_id not in users]
+            if missing:
+                errors.setdefault(index, {"assigned_to": [f'Invalid pk "{user_id}" - object does not exist.' for user_id in missing]})
+
+    def create_tasks(self, creates):
+        tasks = []
+        for data in creates.values():
+            fields = {key: value for key, value in data.items() if key not in ("project", "assigned_to")}
+            tasks.append(Task(project_id=data["project"], **fields))
+        Task.objects.bulk_create(tasks)
+
+        tasks_created(tasks)
+        for task in tasks:
+            task_created(task)
+        assignments = {task: set(data.get("assigned_to", [])) for task, data in zip(tasks, creates.values())}
+        self.assign(assignments)
+        return tasks
+
+    def update_tasks(self, targets, updates):
+        if not targets:
+            return []
+        changed = {"updated_at"}
+        assignments = {}
+        timestamp = now()
+        for index, data in updates.items():
+            task = targets[index]
+            for field, value in data.items():
+                if field == "assigned_to":
+                    assignments[task] = set(value)
+                elif field == "project":
+                    task.project_id = value
+                    changed.add("project")
+                else:
+                    setattr(task, field, value)
+                    changed.add(field)
+            task.updated_at = timestamp
+
+        tasks = list(targets.values())
+        Task.objects.bulk_update(tasks, changed)
+        tasks_changed(tasks)
+        for task in tasks:
+            task_changed(task)
+        self.assign(assignments, replace=True)
+        return tasks
+
+    def assign(self, assignments, replace=False):
+        through = Task.assigned_to.through
+        affected = {user_id for user_ids in assignments.values() for user_id in user_ids}
+        current = defaultdict(set)
+        if replace and assignments:
+            previous = through.objects.filter(task_id__in=[task.id for task in assignments])
+            for task_id, user_id in previous.values_list("task_id", "user_id"):
+                current[task_id].add(user_id)
+                affected.add(user_id)
+            previous.delete()
+        through.objects.bulk_create([
+            through(task_id=task.id, user_id=user_id)
+            for task, user_ids in assignments.items()
+            for user_id in user_ids
+        ])
+        # Bulk writes bypass m2m_changed, so the role cache and the activity
+        # log are updated here.
+        invalidate_user_access(*affected)
+        for task, user_ids in assignments.items():
+            assignments_changed(task, added=user_ids - current[task.id], removed=current[task.id] - user_ids)
+
+
+class TaskAsyncView(AsyncAPIView):
+    async def get(self, request, task_id=None):
+        selected = requested_fields(request, TaskSerializer)
+        if task_id:
+            tasks = Task.objects.with_assignees().with_access(request.user)
+            task = await aget_object_or_404(only_fields(tasks, selected, DETAIL_COLUMNS), id=task_id)
+            if not task.can_view:
+                return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = make_etag("task", task.id, task.updated_at.isoformat(), *(selected or ()))
+            cached = not_modified(request, etag, task.updated_at)
+            if cached is not None:
+                return cached
+            return with_validators(Response(TaskSerializer(task, fields=selected).data), etag, task.updated_at)
+
+        task_filter = TaskFilter(request)
+        tasks = task_filter.filter_queryset(Task.objects.visible_to(request.user))
+        etag = await alist_etag(request, tasks)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        paginator = TaskPagination()
+        paginator.ordering = task_filter.ordering
+        serializer = TaskValuesSerializer(fields=selected)
+        page = await paginator.apaginate_queryset(serializer.values(tasks, paginator.fields), request, view=self)
+        return with_validators(paginator.get_paginated_response(await serializer.ato_representation(page)), etag)